@@ -1,7 +1,8 @@
 from rest_framework import serializers
+from apps.core.serializers import SparseFieldsetMixin
 from .models import CourseAnalytics, StudentActivity, SessionAnalytics
 
-class CourseAnalyticsSerializer(serializers.ModelSerializer):
+class CourseAnalyticsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     course_title = serializers.CharField(source='course.title', read_only=True)
 
     class Meta:
@@ -12,7 +13,7 @@ class CourseAnalyticsSerializer(serializers.ModelSerializer):
             'total_revenue', 'average_rating', 'total_reviews', 'last_updated'
         ]
 
-class StudentActivitySerializer(serializers.ModelSerializer):
+class StudentActivitySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.get_full_name', read_only=True)
     course_title = serializers.CharField(source='course.title', read_only=True)
     lesson_title = serializers.CharField(source='lesson.title', read_only=True)
@@ -24,7 +25,7 @@ class StudentActivitySerializer(serializers.ModelSerializer):
             'activity_type', 'duration_minutes', 'timestamp', 'metadata'
         ]
 
-class SessionAnalyticsSerializer(serializers.ModelSerializer):
+class SessionAnalyticsSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     room_title = serializers.CharField(source='room.title', read_only=True)
 
     class Meta:
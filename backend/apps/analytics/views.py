@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from django.db.models import Count, Avg, Sum
 from django.utils import timezone
 from datetime import timedelta
+from apps.core.pagination import KeysetPagination
 from .models import CourseAnalytics, StudentActivity, SessionAnalytics
 from .serializers import CourseAnalyticsSerializer, StudentActivitySerializer, SessionAnalyticsSerializer
 from apps.courses.models import Course, Enrollment
@@ -17,7 +18,7 @@ class TeacherAnalyticsView(generics.ListAPIView):
             return CourseAnalytics.objects.none()
         
         teacher_courses = Course.objects.filter(teacher=self.request.user)
-        return CourseAnalytics.objects.filter(course__in=teacher_courses)
+        return CourseAnalytics.objects.filter(course__in=teacher_courses).select_related('course')
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -97,14 +98,17 @@ def student_dashboard_stats(request):
 class StudentActivityListView(generics.ListAPIView):
     serializer_class = StudentActivitySerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-timestamp', '-id']
 
     def get_queryset(self):
+        activities = StudentActivity.objects.select_related('student', 'course', 'lesson')
         if self.request.user.user_type == 'student':
-            return StudentActivity.objects.filter(student=self.request.user)
+            return activities.filter(student=self.request.user)
         elif self.request.user.user_type == 'teacher':
             # Teachers can see activities for their courses
             teacher_courses = Course.objects.filter(teacher=self.request.user)
-            return StudentActivity.objects.filter(course__in=teacher_courses)
+            return activities.filter(course__in=teacher_courses)
         return StudentActivity.objects.none()
 
 @api_view(['POST'])
@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from apps.core.identity import remember
+
+
+class IdentityMapJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that shares the authenticated user with the request's
+    identity map, so ``course.teacher`` and the like resolve to it for free
+    """
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            remember(result[0])
+        return result
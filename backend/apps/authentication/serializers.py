@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from apps.core.serializers import SparseFieldsetMixin
 from .models import User
 import logging
 
@@ -69,7 +70,7 @@ class UserLoginSerializer(serializers.Serializer):
         else:
             raise serializers.ValidationError('Must include email and password')
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     full_name = serializers.ReadOnlyField()
 
     class Meta:
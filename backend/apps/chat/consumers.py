@@ -2,6 +2,8 @@ import json
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
+from apps.courses.membership import is_enrolled
+from apps.video_rooms.models import VideoRoom
 from .models import ChatMessage
 from .serializers import ChatMessageSerializer
 
@@ -12,8 +14,9 @@ class ChatConsumer(AsyncWebsocketConsumer):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'chat_{self.room_id}'
         self.user = self.scope['user']
+        self.joined = False
 
-        if self.user.is_anonymous:
+        if self.user.is_anonymous or not await self.can_join():
             await self.close()
             return
 
@@ -24,6 +27,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
         await self.accept()
+        self.joined = True
 
         # Send user joined message
         await self.channel_layer.group_send(
@@ -43,7 +47,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
         )
 
         # Send user left message
-        if hasattr(self, 'user') and not self.user.is_anonymous:
+        if getattr(self, 'joined', False):
             await self.channel_layer.group_send(
                 self.room_group_name,
                 {
@@ -133,6 +137,18 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 'is_typing': event['is_typing']
             }))
 
+    @database_sync_to_async
+    def can_join(self):
+        # Chat rooms are the video rooms of a course
+        if not self.room_id.isdigit():
+            return False
+        room = VideoRoom.objects.filter(pk=self.room_id).values('course_id', 'host_id', 'course__teacher_id').first()
+        if room is None:
+            return False
+        if self.user.pk in (room['host_id'], room['course__teacher_id']):
+            return True
+        return is_enrolled(self.user.pk, room['course_id'])
+
     @database_sync_to_async
     def save_message(self, content):
         try:
@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from .models import ChatMessage, ChatReaction
 from apps.authentication.serializers import UserProfileSerializer
+from apps.core.serializers import SparseFieldsetMixin
 
-class ChatReactionSerializer(serializers.ModelSerializer):
+class ChatReactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
 
     class Meta:
         model = ChatReaction
         fields = ['id', 'user', 'reaction', 'created_at']
+        expandable_fields = ['user']
 
-class ChatMessageSerializer(serializers.ModelSerializer):
+class ChatMessageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
     reactions = ChatReactionSerializer(many=True, read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
@@ -21,6 +23,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
             'file_url', 'file_name', 'file_size', 'timestamp',
             'is_edited', 'edited_at', 'reactions', 'room'
         ]
+        expandable_fields = ['user', 'reactions']
 
 class ChatMessageCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -3,17 +3,32 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.db.models import Count
+from django.db.models import Count, Prefetch
+from apps.core.pagination import KeysetPagination
 from .models import ChatMessage, ChatReaction
 from .serializers import ChatMessageSerializer, ChatMessageCreateSerializer, ChatReactionSerializer
 
+def with_message_plan(queryset, request):
+    """Load only the relations ChatMessageSerializer will serialize for this request"""
+    queryset = queryset.select_related('user')
+    relations = ChatMessageSerializer.get_expanded_relations(request)
+    if 'reactions.user' in relations:
+        queryset = queryset.prefetch_related(
+            Prefetch('reactions', queryset=ChatReaction.objects.select_related('user'))
+        )
+    elif 'reactions' in relations:
+        queryset = queryset.prefetch_related('reactions')
+    return queryset
+
 class ChatMessageListCreateView(generics.ListCreateAPIView):
     serializer_class = ChatMessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['timestamp', 'id']
 
     def get_queryset(self):
         room_id = self.kwargs['room_id']  # Using room_id as room for now
-        return ChatMessage.objects.filter(room=room_id)
+        return with_message_plan(ChatMessage.objects.filter(room=room_id), self.request)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -121,7 +136,9 @@ class MessageThreadView(generics.ListAPIView):
     def get_queryset(self):
         message_id = self.kwargs['message_id']
         # Get threaded replies to a message
-        return ChatMessage.objects.filter(parent_message_id=message_id)
+        return with_message_plan(
+            ChatMessage.objects.filter(parent_message_id=message_id), self.request
+        )
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
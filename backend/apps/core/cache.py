@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import time
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def get_cache_version(namespace):
+    """
+    Current version of a cache namespace. Keys embed the version, so bumping
+    it invalidates every entry of the namespace in O(1).
+    """
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        # Start from the clock so a counter lost to eviction never reuses an old version
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(namespace):
+    key = f'{namespace}:version'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(key, version, None)
+        return version
+
+
+def compress_entry(body, content_type):
+    """
+    Cache entry for a response body, stored gzip-compressed
+    """
+    return {'body': gzip.compress(body), 'content_type': content_type}
+
+
+def build_compressed_response(request, entry):
+    """
+    Response for an entry made by ``compress_entry``, sent compressed to
+    clients accepting gzip and decompressed for the others
+    """
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(entry['body'], content_type=entry['content_type'])
+        response['Content-Encoding'] = 'gzip'
+    else:
+        response = HttpResponse(gzip.decompress(entry['body']), content_type=entry['content_type'])
+    patch_vary_headers(response, ['Accept-Encoding', 'Authorization'])
+    return response
+
+
+class AnonymousResponseCacheMixin:
+    """
+    Serves anonymous GET requests from gzip-compressed responses cached per
+    query string, with its parameters sorted.
+
+    Entries live under ``response_cache_namespace`` and are invalidated by
+    bumping that namespace's version with ``bump_cache_version``. Only one
+    request renders a missing entry, concurrent misses wait for it briefly.
+    """
+    response_cache_namespace = None
+    response_cache_timeout = 60 * 5
+    response_cache_lock_timeout = 10
+    response_cache_wait = 2.0
+
+    def is_response_cacheable(self, request):
+        return (
+            self.response_cache_namespace is not None
+            and request.method == 'GET'
+            and 'HTTP_AUTHORIZATION' not in request.META
+            and 'text/html' not in request.META.get('HTTP_ACCEPT', '')
+        )
+
+    def get_response_cache_key(self, request):
+        # Empty values count, ``?expand=`` trims the payload the bare URL returns in full
+        params = sorted(
+            (key, value)
+            for key, values in request.GET.lists()
+            for value in values
+        )
+        # Paginated bodies embed absolute links, so the host is part of the key
+        digest = hashlib.sha1(
+            repr((request.get_host(), request.path, params)).encode('utf-8')
+        ).hexdigest()
+        version = get_cache_version(self.response_cache_namespace)
+        return f'{self.response_cache_namespace}:v{version}:response:{digest}'
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_response_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request)
+        entry = cache.get(key)
+        if entry is None:
+            entry = self._wait_for_entry(key)
+        if entry is None:
+            lock_key = f'{key}:lock'
+            locked = cache.add(lock_key, 1, self.response_cache_lock_timeout)
+            response = super().dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+            if response.status_code != 200:
+                if locked:
+                    cache.delete(lock_key)
+                return response
+            entry = compress_entry(response.content, response['Content-Type'])
+            cache.set(key, entry, self.response_cache_timeout)
+            if locked:
+                cache.delete(lock_key)
+        return self.build_cached_response(request, entry)
+
+    def _wait_for_entry(self, key):
+        # Another request holds the lock and is rendering this entry
+        deadline = time.monotonic() + self.response_cache_wait
+        while cache.get(f'{key}:lock') and time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def build_cached_response(self, request, entry):
+        return build_compressed_response(request, entry)
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET requests carrying ``If-None-Match`` / ``If-Modified-Since``
+    with 304 Not Modified while the resource is unchanged, before the view
+    evaluates its queryset or serializer.
+
+    Views implement ``get_resource_version()``, a cheap value that changes
+    with the resource (``None`` skips the check), and optionally
+    ``get_resource_modified()``. The ETag also covers the user, the query
+    string and the renderer, which all shape the body.
+    """
+
+    def get_resource_version(self):
+        raise NotImplementedError
+
+    def get_resource_modified(self):
+        return None
+
+    def get_etag(self, request, version):
+        params = sorted(request.GET.lists())
+        renderer = getattr(request, 'accepted_renderer', None)
+        digest = hashlib.sha1(repr((
+            type(self).__name__, sorted(self.kwargs.items()), version,
+            request.user.pk, params, getattr(renderer, 'format', None),
+        )).encode('utf-8')).hexdigest()
+        return quote_etag(digest)
+
+    def get(self, request, *args, **kwargs):
+        version = self.get_resource_version()
+        if version is None:
+            return super().get(request, *args, **kwargs)
+
+        etag = self.get_etag(request, version)
+        modified = self.get_resource_modified()
+        last_modified = int(modified.timestamp()) if modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Clients keep the body but revalidate it on every use
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+        return response
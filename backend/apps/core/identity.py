@@ -0,0 +1,100 @@
+"""
+Request-scoped identity map.
+
+Rows looked up by primary key through ``get_instance`` are kept until the
+response is returned, so a view that resolves the same lesson, course or
+user from ``get_object``, its permission checks and ``perform_update``
+loads it once and every caller shares the same instance. The map lives in
+a context variable installed by ``IdentityMapMiddleware``; outside a
+request (Celery tasks, management commands) nothing is remembered and
+every lookup goes to the database.
+
+Only rows fetched whole belong in the map. Code that changes a remembered
+row with ``QuerySet.update`` should ``forget`` it.
+"""
+from contextvars import ContextVar
+from django.core.exceptions import ValidationError
+from django.http import Http404
+
+_identity_map = ContextVar('identity_map', default=None)
+
+
+def _key(model, pk):
+    return model._meta.concrete_model._meta.label, model._meta.pk.to_python(pk)
+
+
+def remember(*instances):
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        for instance in instances:
+            if instance.pk is not None:
+                identity_map[_key(type(instance), instance.pk)] = instance
+
+
+def forget(model, pk):
+    identity_map = _identity_map.get()
+    if identity_map is not None:
+        identity_map.pop(_key(model, pk), None)
+
+
+def get_instance(model, pk, related=()):
+    """
+    The row of ``model`` with primary key ``pk``, from the identity map when
+    it was already loaded in this request, with its foreign keys ``related``
+    resolved (joined when the row is loaded). Raises ``model.DoesNotExist``.
+    """
+    identity_map = _identity_map.get()
+    key = _key(model, pk)
+    if identity_map is not None and key in identity_map:
+        instance = identity_map[key]
+        resolve_related(instance, *related)
+        return instance
+
+    queryset = model._default_manager.all()
+    if related:
+        queryset = queryset.select_related(*related)
+    instance = queryset.get(pk=pk)
+    if identity_map is not None:
+        identity_map[key] = instance
+        for name in related:
+            field = model._meta.get_field(name)
+            value = getattr(instance, name)
+            if value is not None:
+                # Rows already in the map win, every reference shares one instance
+                field.set_cached_value(
+                    instance, identity_map.setdefault(_key(field.related_model, value.pk), value)
+                )
+    return instance
+
+
+def get_instance_or_404(model, pk, related=()):
+    try:
+        return get_instance(model, pk, related)
+    except (model.DoesNotExist, ValidationError):
+        raise Http404(f'No {model._meta.object_name} matches the given query.')
+
+
+def resolve_related(instance, *names):
+    """
+    Load the foreign keys ``names`` of ``instance`` through the identity map
+    unless they are already cached on it
+    """
+    for name in names:
+        field = instance._meta.get_field(name)
+        if field.is_cached(instance):
+            continue
+        related_id = getattr(instance, field.attname)
+        related = None if related_id is None else get_instance(field.related_model, related_id)
+        field.set_cached_value(instance, related)
+
+
+class IdentityMapMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _identity_map.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _identity_map.reset(token)
@@ -0,0 +1,57 @@
+import logging
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """
+    Database execute wrapper that counts the queries run while it is installed
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class QueryBudgetMixin:
+    """
+    Fails loudly when a view runs more queries than its declared budget.
+
+    ``query_budget`` is either an int applied to every method or a dict keyed
+    by HTTP method (e.g. ``{'GET': 6}``). Methods without a budget are not
+    counted. With ``QUERY_BUDGET_STRICT`` enabled (the default under DEBUG)
+    an overrun raises, otherwise it is logged as a warning.
+    """
+    query_budget = None
+
+    def get_query_budget(self, request):
+        if isinstance(self.query_budget, dict):
+            return self.query_budget.get(request.method)
+        return self.query_budget
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.get_query_budget(request)
+        if budget is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = super().dispatch(request, *args, **kwargs)
+
+        if counter.count > budget:
+            message = (
+                f"{self.__class__.__name__} ran {counter.count} queries for "
+                f"{request.method} {request.path} (budget: {budget})"
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', settings.DEBUG):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,161 @@
+import base64
+import datetime
+import json
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_position_value(value):
+    # Keep full microsecond precision, the seek filter compares for equality
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+def estimate_count(queryset):
+    """
+    Row estimate from the PostgreSQL planner instead of a COUNT(*) scan.
+    Other databases have no usable statistics, so they get an exact count.
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination with opaque cursors.
+
+    Pages are fetched with ``WHERE (created_at, id) < (last_created_at, last_id)``
+    style filters instead of ``OFFSET``, so every page costs the same however
+    deep the client goes, and no ``COUNT(*)`` is run. The ordering is the
+    queryset's explicit ordering, or ``view.keyset_ordering`` (defaulting to
+    ``ordering`` below); the primary key is appended as a tie breaker.
+
+    Views that set ``estimate_count = True`` also get a ``count`` taken from
+    planner statistics.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset, view)
+        self.count = estimate_count(queryset) if getattr(view, 'estimate_count', False) else None
+
+        position, reverse = self.decode_cursor(request)
+        ordering = [self._invert(field) for field in self.ordering] if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.first_position = self.get_position(results[0]) if results else position
+        self.last_position = self.get_position(results[-1]) if results else position
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset, view):
+        ordering = [
+            field for field in queryset.query.order_by
+            if isinstance(field, str) and '__' not in field and field.lstrip('-') != '?'
+        ]
+        if not ordering:
+            ordering = list(getattr(view, 'keyset_ordering', self.ordering))
+        if not {'id', 'pk'} & {field.lstrip('-') for field in ordering}:
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_seek_filter(self, ordering, position):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        seek = Q()
+        for index, field in enumerate(ordering):
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clause = Q(**{f'{field.lstrip("-")}__{lookup}': position[index]})
+            for previous, value in zip(ordering[:index], position[:index]):
+                clause &= Q(**{previous.lstrip('-'): value})
+            seek |= clause
+        return seek
+
+    def get_position(self, instance):
+        return [getattr(instance, field.lstrip('-')) for field in self.ordering]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps({'p': position, 'r': reverse}, default=_encode_position_value)
+        encoded = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.last_position, False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_position is None:
+            return None
+        return self.encode_cursor(self.first_position, True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,133 @@
+from rest_framework import serializers
+
+
+def parse_field_tree(value):
+    """
+    Turn 'id,course.title,course.id' into {'id': {}, 'course': {'title': {}, 'id': {}}}
+    """
+    if value is None or isinstance(value, dict):
+        return value
+    if isinstance(value, str):
+        value = value.split(',')
+    tree = {}
+    for path in value:
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for part in path.split('.'):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class SparseFieldsetMixin:
+    """
+    Lets clients pick fields with ``?fields=`` and choose which nested
+    relations are embedded with ``?expand=``. Both accept comma separated,
+    dotted paths (``?fields=id,course.title&expand=course``).
+
+    Nested relations listed in ``Meta.expandable_fields`` are embedded by
+    default (or only those in ``Meta.default_expand`` when it is set). Once a
+    client passes ``?expand=``, only the listed relations are embedded: single
+    relations collapse to their primary key and to-many relations are left
+    out. Views use ``get_expanded_relations`` to prefetch only what will be
+    serialized.
+    """
+    _sparse_options = None
+
+    def __init__(self, *args, **kwargs):
+        only = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        if only is not None or expand is not None:
+            self._sparse_options = (parse_field_tree(only), parse_field_tree(expand))
+
+    @classmethod
+    def get_sparse_options(cls, request):
+        # Only trim read requests, writes must keep every writable field
+        if request is None or request.method != 'GET':
+            return None, None
+        params = request.query_params
+        return parse_field_tree(params.get('fields')), parse_field_tree(params.get('expand'))
+
+    @classmethod
+    def get_expandable_fields(cls):
+        return list(getattr(cls.Meta, 'expandable_fields', []))
+
+    @classmethod
+    def is_expanded(cls, name, expand):
+        if expand is None:
+            return name in getattr(cls.Meta, 'default_expand', cls.get_expandable_fields())
+        return name in expand
+
+    @classmethod
+    def get_expanded_relations(cls, request=None, only=None, expand=None, prefix=''):
+        """
+        Dotted paths of every nested relation that will be serialized, e.g.
+        {'lessons', 'lessons.materials'}
+        """
+        if request is not None:
+            only, expand = cls.get_sparse_options(request)
+
+        relations = set()
+        for name in cls.get_expandable_fields():
+            if only is not None and name not in only:
+                continue
+            if not cls.is_expanded(name, expand):
+                continue
+            path = prefix + name
+            relations.add(path)
+
+            field = cls._declared_fields[name]
+            child_class = type(getattr(field, 'child', field))
+            if issubclass(child_class, SparseFieldsetMixin):
+                sub_only, sub_expand = cls._get_sub_options(name, only, expand)
+                relations |= child_class.get_expanded_relations(
+                    only=sub_only, expand=sub_expand, prefix=path + '.'
+                )
+        return relations
+
+    @staticmethod
+    def _get_sub_options(name, only, expand):
+        # 'fields=course' keeps the whole course, 'fields=course.title' trims it
+        sub_only = (only.get(name) or None) if only is not None else None
+        sub_expand = expand.get(name, {}) if expand is not None else None
+        return sub_only, sub_expand
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        if self._sparse_options is not None:
+            only, expand = self._sparse_options
+        elif self._is_root():
+            only, expand = self.get_sparse_options(self.context.get('request'))
+        else:
+            only, expand = None, None
+
+        expandable = self.get_expandable_fields()
+        for name in list(fields):
+            if only is not None and name not in only:
+                del fields[name]
+                continue
+            if name not in expandable:
+                continue
+
+            field = fields[name]
+            if not self.is_expanded(name, expand):
+                if isinstance(field, serializers.ListSerializer):
+                    del fields[name]
+                else:
+                    kwargs = {} if field.source in (None, name) else {'source': field.source}
+                    fields[name] = serializers.PrimaryKeyRelatedField(read_only=True, **kwargs)
+                continue
+
+            child = getattr(field, 'child', field)
+            if isinstance(child, SparseFieldsetMixin):
+                child._sparse_options = self._get_sub_options(name, only, expand)
+        return fields
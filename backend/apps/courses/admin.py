@@ -3,7 +3,7 @@ from .models import Category, Course, Lesson, Enrollment, LessonProgress, Course
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
-    list_display = ['name', 'created_at']
+    list_display = ['name', 'parent', 'created_at']
     search_fields = ['name']
 
 @admin.register(Course)
@@ -0,0 +1,128 @@
+import hashlib
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from apps.core.cache import bump_cache_version, get_cache_version
+from .models import Lesson
+
+# Cache namespace of everything the public course catalog serves
+CATALOG_CACHE_NAMESPACE = 'catalog'
+LESSON_COURSE_TIMEOUT = 60 * 60 * 24
+LESSON_SLOTS_TIMEOUT = 60 * 60 * 24
+LESSON_CONTENT_TIMEOUT = 60 * 60 * 24
+
+
+def invalidate_catalog():
+    bump_cache_version(CATALOG_CACHE_NAMESPACE)
+
+
+def get_catalog_cache_key(name, params):
+    """
+    Key for data derived from the catalog under the given query parameters
+    """
+    # Empty values count, an empty ?fields= or ?expand= is not the same request as none
+    params = sorted((key, value) for key, values in params.lists() for value in values)
+    digest = hashlib.sha1(repr(params).encode('utf-8')).hexdigest()
+    version = get_cache_version(CATALOG_CACHE_NAMESPACE)
+    return f'{CATALOG_CACHE_NAMESPACE}:v{version}:{name}:{digest}'
+
+
+def get_course_card_keys(course_ids):
+    """
+    Cache keys of course cards, retired with the rest of the catalog
+    """
+    version = get_cache_version(CATALOG_CACHE_NAMESPACE)
+    return {course_id: f'{CATALOG_CACHE_NAMESPACE}:v{version}:card:{course_id}' for course_id in course_ids}
+
+
+def get_course_namespace(course_id):
+    """
+    Per-course namespace, bumped whenever the course or anything shown with
+    it (lessons, materials, reviews, enrollments) changes
+    """
+    return f'course:{course_id}'
+
+
+def get_course_version(course_id):
+    return get_cache_version(get_course_namespace(course_id))
+
+
+def get_course_modified(course_id):
+    # Unknown until the course first changes after the cache was cleared
+    return cache.get(f'{get_course_namespace(course_id)}:modified')
+
+
+def touch_course(course_id):
+    namespace = get_course_namespace(course_id)
+    bump_cache_version(namespace)
+    cache.set(f'{namespace}:modified', timezone.now(), None)
+
+
+def get_lesson_course_id(lesson_id):
+    key = f'lesson:{lesson_id}:course'
+    course_id = cache.get(key)
+    if course_id is None:
+        course_id = Lesson.objects.filter(pk=lesson_id).values_list('course_id', flat=True).first()
+        if course_id is not None:
+            cache.set(key, course_id, LESSON_COURSE_TIMEOUT)
+    return course_id
+
+
+def get_lesson_namespace(lesson_id):
+    """
+    Per-lesson namespace, bumped only when the lesson's content changes
+    """
+    return f'lesson:{lesson_id}'
+
+
+def get_lesson_version(lesson_id):
+    return get_cache_version(get_lesson_namespace(lesson_id))
+
+
+def get_lesson_modified(lesson_id):
+    # Unknown until the lesson first changes after the cache was cleared
+    return cache.get(f'{get_lesson_namespace(lesson_id)}:modified')
+
+
+def invalidate_lesson_content(lesson_ids):
+    """
+    Once the current transaction commits, give ``lesson_ids`` a new version,
+    retiring their cached content and HTTP validators
+    """
+    def touch_lessons():
+        for lesson_id in lesson_ids:
+            namespace = get_lesson_namespace(lesson_id)
+            bump_cache_version(namespace)
+            cache.set(f'{namespace}:modified', timezone.now(), None)
+
+    lesson_ids = list(lesson_ids)
+    if lesson_ids:
+        transaction.on_commit(touch_lessons)
+
+
+def get_lesson_content_key(lesson_id):
+    """
+    Key of a lesson's rendered content, under the lesson version
+    """
+    return f'{get_lesson_namespace(lesson_id)}:v{get_lesson_version(lesson_id)}:content'
+
+
+def get_lesson_slots(course_id):
+    """
+    Lesson id of every completion bitmap slot of a course, kept under the
+    course version
+    """
+    key = f'{get_course_namespace(course_id)}:v{get_course_version(course_id)}:lesson-slots'
+    slots = cache.get(key)
+    if slots is None:
+        slots = dict(Lesson.objects.filter(course_id=course_id).values_list('slot', 'id'))
+        cache.set(key, slots, LESSON_SLOTS_TIMEOUT)
+    return slots
+
+
+def get_progress_namespace(course_id, student_id):
+    """
+    Namespace of a student's progress in a course, bumped as they complete
+    lessons
+    """
+    return f'{get_course_namespace(course_id)}:progress:{student_id}'
@@ -0,0 +1,106 @@
+"""
+Materialized course detail documents.
+
+The course detail payload (lessons, materials, reviews with their authors and
+the enrollment count) is serialized once and kept in the cache, keyed by a
+per-course version. Changes to a course or anything embedded in its payload
+bump that version and queue a rebuild on the Celery worker, so detail reads
+are a cache lookup plus the requesting user's enrollment status.
+
+Documents are built without a request: media URLs are stored relative and
+made absolute when the document is served, and the per-user fields are left
+at their anonymous values for the view to fill in.
+"""
+import logging
+from django.core.cache import cache
+from django.db import transaction
+from .cache import get_course_namespace, get_course_version, touch_course
+from .models import Course
+from .serializers import CourseDetailSerializer
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_TIMEOUT = 60 * 60 * 24
+REBUILD_QUEUED_TIMEOUT = 60
+MEDIA_FIELDS = frozenset(['thumbnail', 'file', 'profile_picture'])
+
+
+def get_document_key(course_id, version):
+    return f'{get_course_namespace(course_id)}:v{version}:document'
+
+
+def build_course_document(course_id):
+    relations = CourseDetailSerializer.get_expanded_relations()
+    course = (
+        Course.objects.filter(pk=course_id)
+        .with_read_plan(relations)
+        .with_enrollment_count()
+        .first()
+    )
+    if course is None:
+        return None
+    return CourseDetailSerializer(course).data
+
+
+def store_course_document(course_id):
+    """
+    Build the current document of a course and cache it under its version
+    """
+    version = get_course_version(course_id)
+    document = build_course_document(course_id)
+    if document is not None:
+        cache.set(get_document_key(course_id, version), document, DOCUMENT_TIMEOUT)
+    return document
+
+
+def get_course_document(course_id):
+    version = get_course_version(course_id)
+    document = cache.get(get_document_key(course_id, version))
+    if document is None:
+        # Not built yet (or evicted), build it inline rather than wait for the worker
+        document = build_course_document(course_id)
+        if document is not None:
+            cache.set(get_document_key(course_id, version), document, DOCUMENT_TIMEOUT)
+    return document
+
+
+def invalidate_course_documents(course_ids):
+    """
+    Once the current transaction commits, give ``course_ids`` a new version
+    (retiring their documents and HTTP validators) and queue their rebuild
+    """
+    course_ids = set(course_ids)
+    if course_ids:
+        transaction.on_commit(lambda: _refresh_course_documents(course_ids))
+
+
+def _refresh_course_documents(course_ids):
+    from .tasks import rebuild_course_document
+
+    for course_id in course_ids:
+        touch_course(course_id)
+        namespace = get_course_namespace(course_id)
+        # A rebuild that has not started yet will pick up this change as well
+        if not cache.add(f'{namespace}:rebuild-queued', 1, REBUILD_QUEUED_TIMEOUT):
+            continue
+        try:
+            rebuild_course_document.apply_async((course_id,), retry=False)
+        except Exception:
+            # Reads rebuild missing documents themselves
+            cache.delete(f'{namespace}:rebuild-queued')
+            logger.warning('Could not queue rebuild of course document %s', course_id, exc_info=True)
+
+
+def absolutize_media_urls(data, request):
+    if isinstance(data, list):
+        return [absolutize_media_urls(item, request) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: (
+            request.build_absolute_uri(value)
+            if key in MEDIA_FIELDS and isinstance(value, str) and value.startswith('/')
+            else absolutize_media_urls(value, request)
+        )
+        for key, value in data.items()
+    }
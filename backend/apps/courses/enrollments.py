@@ -0,0 +1,91 @@
+"""
+Enrollment admission control.
+
+``Course.current_students`` counts the active enrollments of a course and is
+only ever moved by conditional ``F()`` updates. A seat is taken with
+``UPDATE ... SET current_students = current_students + 1 WHERE
+current_students < max_students`` in the same transaction as the enrollment
+row, so the update's row lock serializes concurrent admissions and a course
+can never be oversubscribed. Duplicates are left to the (student, course)
+unique constraint instead of a separate lookup, and nothing re-counts the
+enrollments table on the way.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from .cache import invalidate_catalog
+from .documents import invalidate_course_documents
+from .membership import invalidate_memberships
+from .models import Course, Enrollment
+from .trending import record_event
+
+
+class AlreadyEnrolled(Exception):
+    pass
+
+
+class CourseFull(Exception):
+    pass
+
+
+def take_seats(course_id, count=1):
+    """
+    Reserve ``count`` seats if they are all still free, returns whether they were
+    """
+    return bool(
+        Course.objects.filter(pk=course_id, current_students__lte=F('max_students') - count)
+        .update(current_students=F('current_students') + count)
+    )
+
+
+def release_seats(course_id, count=1):
+    Course.objects.filter(pk=course_id, current_students__gte=count).update(
+        current_students=F('current_students') - count
+    )
+
+
+def enroll_student(course, student):
+    try:
+        with transaction.atomic():
+            enrollment = Enrollment.objects.create(student=student, course=course)
+            if not take_seats(course.pk):
+                raise CourseFull
+    except IntegrityError:
+        raise AlreadyEnrolled
+    # Course listings show the seat count
+    transaction.on_commit(invalidate_catalog)
+    return enrollment
+
+
+def enroll_students(course, students):
+    """
+    Enroll ``students`` in order for as long as seats last. Returns the ids
+    of the students enrolled and of those already enrolled (in any status);
+    the others did not get a seat.
+    """
+    with transaction.atomic():
+        # Locks the seat count for the whole roster
+        course = Course.objects.select_for_update().only('current_students', 'max_students').get(pk=course.pk)
+        existing = set(
+            Enrollment.objects.filter(course=course, student__in=students).values_list('student_id', flat=True)
+        )
+        free_seats = max(course.max_students - course.current_students, 0)
+        admitted = [student for student in students if student.pk not in existing][:free_seats]
+        if admitted:
+            Enrollment.objects.bulk_create([Enrollment(student=student, course=course) for student in admitted])
+            take_seats(course.pk, len(admitted))
+            # bulk_create sends no post_save, do what the enrollment receivers would
+            record_event(course.pk, 'enrollment', count=len(admitted))
+            invalidate_memberships([student.pk for student in admitted])
+            invalidate_course_documents([course.pk])
+            transaction.on_commit(invalidate_catalog)
+    return {student.pk for student in admitted}, existing
+
+
+def cancel_enrollment(enrollment):
+    """
+    Cancel an active enrollment, locked by the caller with ``select_for_update``
+    """
+    enrollment.status = 'cancelled'
+    enrollment.save(update_fields=['status'])
+    release_seats(enrollment.course_id)
+    transaction.on_commit(invalidate_catalog)
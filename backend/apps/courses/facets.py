@@ -0,0 +1,89 @@
+"""
+Facet counts for the course catalog filters.
+
+Every facet is counted from one grouped aggregate: published courses matching
+the non-facet filters are grouped by (category, difficulty level, price band,
+duration band) and the rows are summed per facet in Python. A facet's counts
+apply every selected filter except its own, so clients can show how many
+courses each alternative value would return.
+"""
+from collections import Counter
+from django.db.models import Case, CharField, Count, Q, Value, When
+from .models import Course
+
+PRICE_BANDS = (
+    ('free', 'Free', Q(price=0)),
+    ('under_50', 'Under 50', Q(price__gt=0, price__lt=50)),
+    ('50_to_100', '50 to 100', Q(price__gte=50, price__lte=100)),
+    ('over_100', 'Over 100', Q(price__gt=100)),
+)
+DURATION_BANDS = (
+    ('short', 'Up to 4 weeks', Q(duration_weeks__lte=4)),
+    ('medium', '5 to 8 weeks', Q(duration_weeks__gte=5, duration_weeks__lte=8)),
+    ('long', 'Over 8 weeks', Q(duration_weeks__gt=8)),
+)
+BANDS = {'price_band': PRICE_BANDS, 'duration_band': DURATION_BANDS}
+FACETS = ('category', 'difficulty_level', 'price_band', 'duration_band')
+
+
+def get_band_choices(name):
+    return [(key, label) for key, label, _ in BANDS[name]]
+
+
+def get_band_filter(name, key):
+    for band_key, _, condition in BANDS[name]:
+        if band_key == key:
+            return condition
+    return Q(pk__in=[])
+
+
+def get_band_case(name):
+    return Case(
+        *[When(condition, then=Value(key)) for key, _, condition in BANDS[name]],
+        output_field=CharField()
+    )
+
+
+def compute_facets(queryset, selected):
+    """
+    ``queryset`` holds the courses matching every non-facet filter and
+    ``selected`` maps facet names to the raw value the client filtered on
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(price_band=get_band_case('price_band'), duration_band=get_band_case('duration_band'))
+        .values('category', 'category__name', 'difficulty_level', 'price_band', 'duration_band')
+        .annotate(course_count=Count('id'))
+    )
+
+    counts = {name: Counter() for name in FACETS}
+    category_names = {}
+    total = 0
+    for row in rows:
+        category_names[row['category']] = row['category__name']
+        matches = {
+            name: name not in selected or str(row[name]) == selected[name]
+            for name in FACETS
+        }
+        if all(matches.values()):
+            total += row['course_count']
+        for name in FACETS:
+            if all(matched for other, matched in matches.items() if other != name):
+                counts[name][row[name]] += row['course_count']
+
+    def buckets(name, choices):
+        return [
+            {'value': value, 'label': label, 'count': counts[name][value]}
+            for value, label in choices
+        ]
+
+    categories = sorted(category_names.items(), key=lambda item: (-counts['category'][item[0]], item[1]))
+    return {
+        'count': total,
+        'facets': {
+            'category': [bucket for bucket in buckets('category', categories) if bucket['count']],
+            'difficulty_level': buckets('difficulty_level', Course.DIFFICULTY_CHOICES),
+            'price_band': buckets('price_band', get_band_choices('price_band')),
+            'duration_band': buckets('duration_band', get_band_choices('duration_band')),
+        },
+    }
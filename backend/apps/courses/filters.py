@@ -0,0 +1,70 @@
+import django_filters
+from django.db.models import Case, IntegerField, When
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.settings import api_settings
+from .facets import get_band_choices, get_band_filter
+from .models import Course
+from .search import MAX_RESULTS, get_search_backend, parse_query
+
+
+class CourseFilter(django_filters.FilterSet):
+    price_band = django_filters.ChoiceFilter(
+        choices=get_band_choices('price_band'), method='filter_band'
+    )
+    duration_band = django_filters.ChoiceFilter(
+        choices=get_band_choices('duration_band'), method='filter_band'
+    )
+    category_tree = django_filters.NumberFilter(method='filter_category_tree')
+
+    class Meta:
+        model = Course
+        fields = ['category', 'difficulty_level', 'teacher', 'price_band', 'duration_band', 'category_tree']
+
+    def filter_band(self, queryset, name, value):
+        return queryset.filter(get_band_filter(name, value))
+
+    def filter_category_tree(self, queryset, name, value):
+        return queryset.in_category_tree(value)
+
+
+def get_model_choice_params(params):
+    """
+    Names of the ``CourseFilter`` model choice filters set in ``params``,
+    validating each value looks its row up with one query
+    """
+    return [
+        name for name, filter_ in CourseFilter.base_filters.items()
+        if isinstance(filter_, django_filters.ModelChoiceFilter) and params.get(name)
+    ]
+
+
+class CourseSearchFilter(BaseFilterBackend):
+    """
+    Ranked full-text search over published courses (``?search=``).
+
+    Results are ordered by relevance unless the client asks for another
+    ``?ordering=``. The parsed terms are left on ``view.search_terms`` so
+    the serializer can add highlighted snippets for the returned page.
+    """
+    search_param = api_settings.SEARCH_PARAM
+    ordering_param = api_settings.ORDERING_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        terms = parse_query(request.query_params.get(self.search_param, ''))
+        if not terms:
+            return queryset
+
+        view.search_terms = terms
+        ranked_ids = get_search_backend().search(terms, MAX_RESULTS)
+        if not ranked_ids:
+            return queryset.none()
+
+        queryset = queryset.filter(id__in=ranked_ids)
+        if request.query_params.get(self.ordering_param) in (None, '', 'relevance'):
+            queryset = queryset.annotate(
+                search_rank=Case(
+                    *[When(id=course_id, then=position) for position, course_id in enumerate(ranked_ids)],
+                    output_field=IntegerField()
+                )
+            ).order_by('search_rank', 'id')
+        return queryset
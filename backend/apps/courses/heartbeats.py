@@ -0,0 +1,140 @@
+"""
+Time-on-task from player and reader heartbeats.
+
+Heartbeats never touch the database. Each one adds its elapsed seconds to a
+counter in the shared cache, in a bucket per ``HEARTBEAT_WINDOW`` of wall
+clock time, and records the latest playback position. The first heartbeat
+of a (student, lesson) pair in a bucket also appends the pair to the
+bucket's index, so the flusher can find every entry without scanning keys.
+
+A periodic task flushes closed buckets: one query resolves the students'
+enrollments, one reads the current totals and one bulk upsert writes all
+pairs of the bucket to ``LessonProgress``. However many learners are
+active, that is a few statements per window.
+"""
+import time
+from collections import defaultdict
+from django.core.cache import cache
+from django.db import transaction
+from .models import Lesson, LessonProgress
+
+HEARTBEAT_WINDOW = 60
+# Longest interval one heartbeat may report, longer gaps are idle time
+MAX_HEARTBEAT_SECONDS = 120
+BUCKET_TIMEOUT = 60 * 60 * 6
+# Buckets older than this when the flusher catches up are dropped
+MAX_BACKLOG_BUCKETS = 60 * 6
+FLUSH_LOCK_TIMEOUT = 60 * 5
+UPSERT_BATCH_SIZE = 1000
+
+
+def get_bucket(now=None):
+    return int((now or time.time()) // HEARTBEAT_WINDOW)
+
+
+def record_heartbeat(student_id, lesson_id, elapsed_seconds, position_seconds=None):
+    prefix = f'heartbeats:{get_bucket()}'
+    entry = f'{prefix}:{student_id}:{lesson_id}'
+    if cache.add(f'{entry}:seconds', elapsed_seconds, BUCKET_TIMEOUT):
+        cache.add(f'{prefix}:count', 0, BUCKET_TIMEOUT)
+        index = cache.incr(f'{prefix}:count')
+        cache.set(f'{prefix}:entry:{index}', (student_id, lesson_id), BUCKET_TIMEOUT)
+    elif elapsed_seconds:
+        cache.incr(f'{entry}:seconds', elapsed_seconds)
+    if position_seconds is not None:
+        cache.set(f'{entry}:position', position_seconds, BUCKET_TIMEOUT)
+
+
+def flush_heartbeats():
+    """
+    Write every closed bucket not flushed yet, returns the number of
+    progress rows written
+    """
+    if not cache.add('heartbeats:flush-lock', 1, FLUSH_LOCK_TIMEOUT):
+        return 0
+    try:
+        # The bucket before the current one may still receive late heartbeats
+        last_closed = get_bucket() - 2
+        first = last_closed - MAX_BACKLOG_BUCKETS
+        flushed = cache.get('heartbeats:flushed')
+        if flushed is not None:
+            first = max(first, flushed + 1)
+        written = 0
+        for bucket in range(first, last_closed + 1):
+            written += flush_bucket(bucket)
+            cache.set('heartbeats:flushed', bucket, None)
+        return written
+    finally:
+        cache.delete('heartbeats:flush-lock')
+
+
+def flush_bucket(bucket):
+    prefix = f'heartbeats:{bucket}'
+    count = cache.get(f'{prefix}:count') or 0
+    if not count:
+        return 0
+    index_keys = [f'{prefix}:entry:{index}' for index in range(1, count + 1)]
+    pairs = list(cache.get_many(index_keys).values())
+    value_keys = [
+        f'{prefix}:{student_id}:{lesson_id}:{field}'
+        for student_id, lesson_id in pairs for field in ('seconds', 'position')
+    ]
+    values = cache.get_many(value_keys)
+
+    totals = {}
+    for student_id, lesson_id in pairs:
+        entry = f'{prefix}:{student_id}:{lesson_id}'
+        totals[student_id, lesson_id] = (values.get(f'{entry}:seconds', 0), values.get(f'{entry}:position'))
+
+    written = write_time_on_task(totals)
+    cache.delete_many(index_keys + value_keys + [f'{prefix}:count'])
+    return written
+
+
+def write_time_on_task(totals):
+    """
+    Add ``totals``, {(student id, lesson id): (seconds, position)}, to the
+    progress of the students' active enrollments
+    """
+    lesson_ids = defaultdict(set)
+    for student_id, lesson_id in totals:
+        lesson_ids[lesson_id].add(student_id)
+    # Students may have left the course since: pairs without an active enrollment are dropped
+    enrollments = {
+        (student_id, lesson_id): enrollment_id
+        for lesson_id, student_id, enrollment_id in Lesson.objects.filter(
+            pk__in=lesson_ids,
+            course__enrollments__student_id__in={student_id for student_id, _ in totals},
+            course__enrollments__status='active'
+        ).values_list('id', 'course__enrollments__student_id', 'course__enrollments__id')
+        if student_id in lesson_ids[lesson_id]
+    }
+    if not enrollments:
+        return 0
+
+    with transaction.atomic():
+        current = {
+            (enrollment_id, lesson_id): (seconds, position)
+            for enrollment_id, lesson_id, seconds, position in LessonProgress.objects.select_for_update().filter(
+                enrollment_id__in=set(enrollments.values()), lesson_id__in=lesson_ids
+            ).values_list('enrollment_id', 'lesson_id', 'time_spent_seconds', 'last_position_seconds')
+        }
+        rows = []
+        for (student_id, lesson_id), enrollment_id in enrollments.items():
+            seconds, position = totals[student_id, lesson_id]
+            current_seconds, current_position = current.get((enrollment_id, lesson_id), (0, None))
+            total = current_seconds + seconds
+            if position is None:
+                position = current_position
+            rows.append(LessonProgress(
+                enrollment_id=enrollment_id, lesson_id=lesson_id,
+                time_spent_seconds=total, time_spent_minutes=total // 60,
+                last_position_seconds=position
+            ))
+        # Existing rows keep their completion, only the time fields are updated
+        LessonProgress.objects.bulk_create(
+            rows, batch_size=UPSERT_BATCH_SIZE, update_conflicts=True,
+            unique_fields=['enrollment', 'lesson'],
+            update_fields=['time_spent_seconds', 'time_spent_minutes', 'last_position_seconds']
+        )
+    return len(rows)
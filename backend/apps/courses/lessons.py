@@ -0,0 +1,169 @@
+"""
+Lesson batches and ordering.
+
+A course outline is saved as a whole: lessons are updated with one
+``bulk_update`` and created with one ``bulk_create`` inside the caller's
+transaction, with the course row locked so concurrent batches cannot hand
+out the same slot. Bulk queries send no model signals, the publication
+counters, course documents and catalog are updated here.
+
+Lesson orders are sort keys ``Lesson.ORDER_GAP`` apart rather than
+positions. Moving a lesson gives it the order halfway between its new
+neighbours, rewriting that one row; when two neighbours run out of room
+the course is rebalanced, inline if the move needs it and in the
+background once gaps get small. ``(course, order)`` is unique and checked
+row by row by the database, so lessons written in bulk are first parked
+on orders past every used one and then moved to their final orders, two
+statements however the outline was shuffled.
+"""
+from collections import Counter
+from django.db import transaction
+from .cache import invalidate_catalog, invalidate_lesson_content
+from .documents import invalidate_course_documents
+from .models import Course, Lesson
+from .progress import record_publication
+
+# Moves leaving less room than this next to the lesson queue a rebalance
+MIN_ORDER_GAP = 8
+
+
+class LessonOrderConflict(Exception):
+    def __init__(self, orders):
+        super().__init__(orders)
+        self.orders = orders
+
+
+def lock_course_lessons(course):
+    """
+    Lock ``course`` for the rest of the transaction and return its lessons by id
+    """
+    Course.objects.select_for_update().filter(pk=course.pk).values_list('pk', flat=True).get()
+    return {lesson.pk: lesson for lesson in Lesson.objects.filter(course=course)}
+
+
+def park_lessons(lessons, above):
+    """
+    Write ``lessons`` with unused orders past ``above``, so that writing
+    their new orders next cannot collide with an order still held by one
+    of them
+    """
+    orders = [lesson.order for lesson in lessons]
+    for offset, lesson in enumerate(lessons, 1):
+        lesson.order = above + offset
+    Lesson.objects.bulk_update(lessons, ['order'])
+    for lesson, order in zip(lessons, orders):
+        lesson.order = order
+
+
+def save_lessons(course, lessons, updates, creates):
+    """
+    Apply ``updates``, (lesson, changed fields) pairs of the course's
+    ``lessons`` returned by ``lock_course_lessons``, and create a lesson for
+    each dict of fields in ``creates``, after the last lesson when it has no
+    order. Returns the updated lessons followed by the created ones.
+    """
+    original_orders = {lesson.pk: lesson.order for lesson in lessons.values()}
+    was_published = {lesson.pk: lesson.is_published for lesson, _ in updates}
+    update_fields = set()
+    for lesson, data in updates:
+        for field, value in data.items():
+            setattr(lesson, field, value)
+        update_fields.update(data)
+
+    orders = Counter(lesson.order for lesson in lessons.values())
+    orders.update(data['order'] for data in creates if 'order' in data)
+    conflicts = sorted(order for order, count in orders.items() if count > 1)
+    if conflicts:
+        raise LessonOrderConflict(conflicts)
+    next_order = max(orders, default=0) + Lesson.ORDER_GAP
+    for data in creates:
+        if 'order' not in data:
+            data['order'] = next_order
+            next_order += Lesson.ORDER_GAP
+
+    moved = [lesson for lesson, _ in updates if lesson.order != original_orders[lesson.pk]]
+    if moved:
+        park_lessons(moved, max(max(original_orders.values()), max(orders)))
+    if update_fields:
+        Lesson.objects.bulk_update([lesson for lesson, _ in updates], sorted(update_fields))
+    if 'content' in update_fields:
+        invalidate_lesson_content([lesson.pk for lesson, data in updates if 'content' in data])
+
+    next_slot = max((lesson.slot for lesson in lessons.values()), default=-1) + 1
+    created = Lesson.objects.bulk_create([
+        Lesson(course=course, slot=next_slot + offset, **data) for offset, data in enumerate(creates)
+    ])
+
+    # What the Lesson receivers would have done
+    published = sum(lesson.is_published for lesson in created) + sum(
+        lesson.is_published - was_published[lesson.pk] for lesson, _ in updates
+    )
+    if published:
+        record_publication(course.pk, published)
+    for lesson in [lesson for lesson, _ in updates] + created:
+        lesson._loaded_is_published = lesson.is_published
+    invalidate_course_documents([course.pk])
+    transaction.on_commit(invalidate_catalog)
+    return [lesson for lesson, _ in updates] + created
+
+
+def move_lesson(lesson, after=None):
+    """
+    Place ``lesson`` right after the lesson ``after`` of the same course,
+    first when it is None
+    """
+    from .tasks import rebalance_course_lessons
+
+    with transaction.atomic():
+        Course.objects.select_for_update().filter(pk=lesson.course_id).values_list('pk', flat=True).get()
+        lesson.refresh_from_db(fields=['order'])
+        low, high = _get_neighbour_orders(lesson, after)
+        if low < lesson.order < high:
+            return lesson
+        if high - low < 2:
+            rebalance_lesson_orders(lesson.course_id)
+            low, high = _get_neighbour_orders(lesson, after)
+
+        lesson.order = (low + high) // 2
+        # A single row, its receivers retire the course's documents and catalog entries
+        lesson.save(update_fields=['order'])
+        if min(lesson.order - low, high - lesson.order) < MIN_ORDER_GAP:
+            transaction.on_commit(lambda: rebalance_course_lessons.delay(lesson.course_id))
+    return lesson
+
+
+def _get_neighbour_orders(lesson, after):
+    """
+    Orders of the lessons ``lesson`` goes between, past the last one when
+    nothing follows ``after``
+    """
+    others = Lesson.objects.filter(course_id=lesson.course_id).exclude(pk=lesson.pk)
+    low = 0
+    if after is not None:
+        low = others.values_list('order', flat=True).get(pk=after.pk)
+        others = others.filter(order__gt=low)
+    high = others.order_by('order').values_list('order', flat=True).first()
+    return low, low + 2 * Lesson.ORDER_GAP if high is None else high
+
+
+def rebalance_lesson_orders(course_id):
+    """
+    Spread a course's lessons ``Lesson.ORDER_GAP`` apart again, keeping
+    their order
+    """
+    with transaction.atomic():
+        Course.objects.select_for_update().filter(pk=course_id).values_list('pk', flat=True).get()
+        lessons = list(Lesson.objects.filter(course_id=course_id).order_by('order', 'pk').only('pk', 'order'))
+        if not lessons:
+            return
+        above = max(lessons[-1].order, len(lessons) * Lesson.ORDER_GAP)
+        changed = []
+        for position, lesson in enumerate(lessons, 1):
+            if lesson.order != position * Lesson.ORDER_GAP:
+                lesson.order = position * Lesson.ORDER_GAP
+                changed.append(lesson)
+        if changed:
+            park_lessons(changed, above)
+            Lesson.objects.bulk_update(changed, ['order'])
+            invalidate_course_documents([course_id])
+            transaction.on_commit(invalidate_catalog)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from apps.courses.models import Course, Enrollment, Lesson
+from apps.courses.progress import get_completed_slots, recount_course_progress
+
+
+class Command(BaseCommand):
+    help = 'Compare the denormalized lesson progress counters and bitmaps with a full recount'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Recount the courses that drifted')
+
+    def handle(self, *args, **options):
+        stale_courses = set()
+        for course in Course.objects.only('pk', 'published_lesson_count').iterator():
+            if course.lessons.filter(is_published=True).count() != course.published_lesson_count:
+                stale_courses.add(course.pk)
+
+        enrollments = Enrollment.objects.only(
+            'pk', 'course_id', 'completed_count', 'completion_bitmap', 'progress_percentage'
+        )
+        for enrollment in enrollments.iterator():
+            slots = set(enrollment.lesson_progress.filter(completed=True).values_list('lesson__slot', flat=True))
+            completed = len(slots)
+            total = Lesson.objects.filter(course_id=enrollment.course_id, is_published=True).count()
+            percentage = round(min(completed / total * 100, 100), 2) if total else 0
+            if (
+                completed != enrollment.completed_count
+                or slots != set(get_completed_slots(enrollment.completion_bitmap))
+                or abs(float(enrollment.progress_percentage) - percentage) > 0.01
+            ):
+                self.stdout.write(
+                    f'Enrollment {enrollment.pk}: stored {enrollment.completed_count} lessons '
+                    f'({enrollment.progress_percentage}%), counted {completed} ({percentage}%)'
+                )
+                stale_courses.add(enrollment.course_id)
+
+        if not stale_courses:
+            self.stdout.write(self.style.SUCCESS('Progress counters match a full recount'))
+            return
+        self.stdout.write(self.style.WARNING(f'{len(stale_courses)} courses have drifted'))
+        if options['repair']:
+            for course_id in stale_courses:
+                recount_course_progress(course_id)
+            self.stdout.write(self.style.SUCCESS(f'Recounted {len(stale_courses)} courses'))
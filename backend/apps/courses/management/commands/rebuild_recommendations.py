@@ -0,0 +1,17 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.courses.recommendations import TOP_K, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the "students also took" course recommendations'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help='Neighbours kept per course')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = rebuild_recommendations(k=options['top_k'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {count} recommendations in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from apps.courses.models import Course, CourseSearchDocument
+from apps.courses.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the course search documents from scratch'
+
+    def handle(self, *args, **options):
+        rebuild_index(Course.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {CourseSearchDocument.objects.count()} published courses'
+        ))
@@ -0,0 +1,51 @@
+"""
+Course membership of users.
+
+Lessons, materials, reviews, video rooms and chat all ask whether the user
+is enrolled in a course, often several times per page. Each user's
+enrollments are cached as one ``{course id: status}`` dict (cancelled ones
+left out), so after the first check of a session they are dictionary
+lookups. Saving or deleting an enrollment drops its student's entry through
+the enrollment signals; paths that bypass signals, like ``bulk_create``,
+call ``invalidate_memberships`` themselves.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from .models import Enrollment
+
+MEMBERSHIP_TIMEOUT = 60 * 60
+ACTIVE = ('active',)
+# Reviews and progress stay open to students who finished the course
+ACTIVE_OR_COMPLETED = ('active', 'completed')
+
+
+def get_membership_key(user_id):
+    return f'user:{user_id}:memberships'
+
+
+def get_memberships(user_id):
+    if user_id is None:
+        return {}
+    key = get_membership_key(user_id)
+    memberships = cache.get(key)
+    if memberships is None:
+        memberships = dict(
+            Enrollment.objects.filter(student_id=user_id).exclude(status='cancelled')
+            .values_list('course_id', 'status')
+        )
+        cache.set(key, memberships, MEMBERSHIP_TIMEOUT)
+    return memberships
+
+
+def get_active_course_ids(user_id):
+    return {course_id for course_id, status in get_memberships(user_id).items() if status in ACTIVE}
+
+
+def is_enrolled(user_id, course_id, statuses=ACTIVE):
+    return get_memberships(user_id).get(course_id) in statuses
+
+
+def invalidate_memberships(user_ids):
+    keys = [get_membership_key(user_id) for user_id in user_ids]
+    # Once committed, so the checks that refill the cache see the change
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,120 @@
+# Generated by Django 4.2.7 on 2026-10-18 09:12
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRES_FORWARD = [
+    """
+    CREATE FUNCTION courses_search_document_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.teacher_name, '') || ' ' || coalesce(NEW.category_name, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER courses_search_document_vector_trigger
+    BEFORE INSERT OR UPDATE ON courses_coursesearchdocument
+    FOR EACH ROW EXECUTE FUNCTION courses_search_document_vector()
+    """,
+    """
+    CREATE INDEX courses_search_document_vector_idx
+    ON courses_coursesearchdocument USING GIN (search_vector)
+    """,
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS courses_search_document_vector_idx",
+    "DROP TRIGGER IF EXISTS courses_search_document_vector_trigger ON courses_coursesearchdocument",
+    "DROP FUNCTION IF EXISTS courses_search_document_vector()",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE courses_coursesearch_fts USING fts5(
+        title, description, teacher_name, category_name,
+        content='courses_coursesearchdocument', content_rowid='course_id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER courses_coursesearch_fts_insert AFTER INSERT ON courses_coursesearchdocument BEGIN
+        INSERT INTO courses_coursesearch_fts(rowid, title, description, teacher_name, category_name)
+        VALUES (new.course_id, new.title, new.description, new.teacher_name, new.category_name);
+    END
+    """,
+    """
+    CREATE TRIGGER courses_coursesearch_fts_delete AFTER DELETE ON courses_coursesearchdocument BEGIN
+        INSERT INTO courses_coursesearch_fts(courses_coursesearch_fts, rowid, title, description, teacher_name, category_name)
+        VALUES ('delete', old.course_id, old.title, old.description, old.teacher_name, old.category_name);
+    END
+    """,
+    """
+    CREATE TRIGGER courses_coursesearch_fts_update AFTER UPDATE ON courses_coursesearchdocument BEGIN
+        INSERT INTO courses_coursesearch_fts(courses_coursesearch_fts, rowid, title, description, teacher_name, category_name)
+        VALUES ('delete', old.course_id, old.title, old.description, old.teacher_name, old.category_name);
+        INSERT INTO courses_coursesearch_fts(rowid, title, description, teacher_name, category_name)
+        VALUES (new.course_id, new.title, new.description, new.teacher_name, new.category_name);
+    END
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS courses_coursesearch_fts_update",
+    "DROP TRIGGER IF EXISTS courses_coursesearch_fts_delete",
+    "DROP TRIGGER IF EXISTS courses_coursesearch_fts_insert",
+    "DROP TABLE IF EXISTS courses_coursesearch_fts",
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+def index_published_courses(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseSearchDocument = apps.get_model('courses', 'CourseSearchDocument')
+    courses = Course.objects.filter(status='published').select_related('teacher', 'category')
+    for course in courses.iterator():
+        CourseSearchDocument.objects.create(
+            course=course,
+            title=course.title,
+            description=course.description,
+            teacher_name=f"{course.teacher.first_name} {course.teacher.last_name}".strip(),
+            category_name=course.category.name,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_lessonmaterial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSearchDocument',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='courses.course')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('teacher_name', models.CharField(blank=True, max_length=300)),
+                ('category_name', models.CharField(blank=True, max_length=100)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRES_REVERSE, 'sqlite': SQLITE_REVERSE}),
+        ),
+        migrations.RunPython(index_published_courses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.7 on 2026-10-18 11:05
+
+import datetime
+from django.db import migrations, models
+
+# apps.courses.trending when this migration was written, scores were stored
+# scaled rather than as logarithms (see 0012)
+TRENDING_EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+TRENDING_HALF_LIFE = datetime.timedelta(days=7)
+EVENT_WEIGHTS = {'enrollment': 3.0, 'review': 2.0, 'completion': 1.0}
+
+
+def get_scaled_weight(event, when):
+    return EVENT_WEIGHTS[event] * 2 ** ((when - TRENDING_EPOCH) / TRENDING_HALF_LIFE)
+
+
+def backfill_trending_scores(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    CourseReview = apps.get_model('courses', 'CourseReview')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+
+    scores = {}
+    events = [
+        ('enrollment', Enrollment.objects.values_list('course_id', 'enrolled_at')),
+        ('review', CourseReview.objects.values_list('course_id', 'created_at')),
+        ('completion', LessonProgress.objects.filter(
+            completed=True, completed_at__isnull=False
+        ).values_list('enrollment__course_id', 'completed_at')),
+    ]
+    for event, rows in events:
+        for course_id, when in rows.iterator():
+            scores[course_id] = scores.get(course_id, 0) + get_scaled_weight(event, when)
+    for course_id, score in scores.items():
+        Course.objects.filter(pk=course_id).update(trending_score=score)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_coursesearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['status', '-trending_score', '-id'], name='course_trending_idx'),
+        ),
+        migrations.RunPython(backfill_trending_scores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_course_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to='courses.course')),
+                ('related_course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommended_for', to='courses.course')),
+            ],
+            options={
+                'ordering': ['course', 'rank'],
+                'unique_together': {('course', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def add_self_links(apps, schema_editor):
+    Category = apps.get_model('courses', 'Category')
+    CategoryClosure = apps.get_model('courses', 'CategoryClosure')
+    CategoryClosure.objects.bulk_create([
+        CategoryClosure(ancestor_id=category_id, descendant_id=category_id, depth=0)
+        for category_id in Category.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_courserecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='children', to='courses.category'),
+        ),
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='courses.category')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='courses.category')),
+            ],
+            options={
+                'unique_together': {('ancestor', 'descendant')},
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='category_ancestors_idx')],
+            },
+        ),
+        migrations.RunPython(add_self_links, migrations.RunPython.noop),
+    ]
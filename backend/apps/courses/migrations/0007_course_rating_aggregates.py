@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:20
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    CourseReview = apps.get_model('courses', 'CourseReview')
+
+    histograms = {}
+    rows = CourseReview.objects.order_by().values_list('course_id', 'rating').annotate(models.Count('id'))
+    for course_id, stars, count in rows:
+        histograms.setdefault(course_id, {})[stars] = count
+    for course_id, histogram in histograms.items():
+        rating_count = sum(histogram.values())
+        rating_sum = sum(stars * count for stars, count in histogram.items())
+        Course.objects.filter(pk=course_id).update(
+            rating_sum=rating_sum,
+            rating_count=rating_count,
+            rating=(Decimal(rating_sum) / rating_count).quantize(Decimal('0.01')),
+            **{f'rating_{stars}_count': histogram.get(stars, 0) for stars in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_category_closure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='coursereview',
+            index=models.Index(fields=['course', '-created_at', '-id'], name='course_review_recent_idx'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_progress_counters(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Lesson = apps.get_model('courses', 'Lesson')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+
+    Course.objects.update(published_lesson_count=Coalesce(Subquery(
+        Lesson.objects.filter(course=OuterRef('pk'), is_published=True)
+        .order_by().values('course').annotate(count=Count('id')).values('count')
+    ), 0))
+    Enrollment.objects.update(completed_count=Coalesce(Subquery(
+        LessonProgress.objects.filter(enrollment=OuterRef('pk'), completed=True)
+        .order_by().values('enrollment').annotate(count=Count('id')).values('count')
+    ), 0))
+    published = dict(Course.objects.values_list('pk', 'published_lesson_count'))
+    for enrollment in Enrollment.objects.only('pk', 'course_id', 'completed_count').iterator():
+        total = published.get(enrollment.course_id, 0)
+        percentage = min(enrollment.completed_count / total * 100, 100) if total else 0
+        Enrollment.objects.filter(pk=enrollment.pk).update(progress_percentage=round(percentage, 2))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_course_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='published_lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_progress_counters, migrations.RunPython.noop),
+    ]
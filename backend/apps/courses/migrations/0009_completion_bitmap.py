@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:40
+
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def backfill_slots_and_bitmaps(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+
+    lessons = list(Lesson.objects.order_by('course_id', 'order', 'id').only('pk', 'course_id'))
+    next_slot = defaultdict(int)
+    for lesson in lessons:
+        lesson.slot = next_slot[lesson.course_id]
+        next_slot[lesson.course_id] += 1
+    Lesson.objects.bulk_update(lessons, ['slot'], batch_size=500)
+
+    bits = defaultdict(int)
+    completions = LessonProgress.objects.filter(completed=True).values_list('enrollment_id', 'lesson__slot')
+    for enrollment_id, slot in completions.iterator():
+        bits[enrollment_id] |= 1 << slot
+    enrollments = list(Enrollment.objects.filter(pk__in=bits).only('pk'))
+    for enrollment in enrollments:
+        value = bits[enrollment.pk]
+        enrollment.completion_bitmap = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+    Enrollment.objects.bulk_update(enrollments, ['completion_bitmap'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0008_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='slot',
+            field=models.PositiveIntegerField(default=0, editable=False),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completion_bitmap',
+            field=models.BinaryField(default=b'', editable=False),
+        ),
+        migrations.RunPython(backfill_slots_and_bitmaps, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='lesson',
+            unique_together={('course', 'order'), ('course', 'slot')},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 18:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_time_spent_seconds(apps, schema_editor):
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    LessonProgress.objects.filter(time_spent_minutes__gt=0).update(time_spent_seconds=F('time_spent_minutes') * 60)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0009_completion_bitmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='time_spent_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='last_position_seconds',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_time_spent_seconds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:05
+
+from django.db import migrations
+from django.db.models import F
+
+# Lesson.ORDER_GAP when this migration was written
+ORDER_GAP = 1024
+
+
+def spread_lesson_orders(apps, schema_editor):
+    Lesson = apps.get_model('courses', 'Lesson')
+    course_ids = Lesson.objects.values_list('course_id', flat=True).distinct()
+    for course_id in course_ids.iterator():
+        lessons = list(Lesson.objects.filter(course_id=course_id).order_by('order', 'pk').only('pk', 'order'))
+        # Park every lesson past its final order first, (course, order) is unique
+        above = max(lessons[-1].order, len(lessons) * ORDER_GAP) + 1
+        Lesson.objects.filter(course_id=course_id).update(order=F('order') + above)
+        for position, lesson in enumerate(lessons, 1):
+            lesson.order = position * ORDER_GAP
+        Lesson.objects.bulk_update(lessons, ['order'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0010_lessonprogress_time_on_task'),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_lesson_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 21:10
+
+from django.db import migrations
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Log, Power
+
+
+def store_log_scores(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    # Courses without events keep 0, the logarithm of a long decayed weight of 1
+    Course.objects.filter(trending_score__gt=0).update(
+        trending_score=Log(Value(2.0), F('trending_score'), output_field=FloatField())
+    )
+
+
+def store_scaled_scores(apps, schema_editor):
+    Course = apps.get_model('courses', 'Course')
+    Course.objects.exclude(trending_score=0).update(trending_score=Power(Value(2.0), F('trending_score'), output_field=FloatField()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0011_gapped_lesson_order'),
+    ]
+
+    operations = [
+        migrations.RunPython(store_log_scores, store_scaled_scores),
+    ]
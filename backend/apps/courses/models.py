@@ -1,18 +1,143 @@
-from django.db import models
+from django.db import models, transaction
+from django.contrib.postgres.search import SearchVectorField
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+class CategoryQuerySet(models.QuerySet):
+    def with_course_counts(self):
+        """
+        Annotate ``published_course_count``: published courses in each
+        category and all of its subcategories
+        """
+        return self.annotate(
+            published_course_count=models.Count(
+                'descendant_links__descendant__courses',
+                filter=models.Q(descendant_links__descendant__courses__status='published')
+            )
+        )
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(blank=True)
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='children'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    def is_ancestor_of(self, category_id):
+        return CategoryClosure.objects.filter(ancestor=self, descendant_id=category_id).exists()
+
+    def clean(self):
+        if self.pk and self.parent_id and self.is_ancestor_of(self.parent_id):
+            raise ValidationError({'parent': 'A category cannot be moved under its own subtree'})
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        moved = not adding and self.parent_id != getattr(self, '_loaded_parent_id', self.parent_id)
+        if moved and self.parent_id and self.is_ancestor_of(self.parent_id):
+            raise ValueError('A category cannot be moved under its own subtree')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                CategoryClosure.add_node(self)
+            elif moved:
+                CategoryClosure.move_subtree(self)
+        self._loaded_parent_id = self.parent_id
+
     class Meta:
         verbose_name_plural = 'Categories'
 
+class CategoryClosure(models.Model):
+    """
+    Every (ancestor, descendant) pair of the category tree, including each
+    category paired with itself at depth 0, so a whole subtree is one
+    indexed lookup on ``ancestor``
+    """
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveSmallIntegerField()
+
+    @classmethod
+    def add_node(cls, category):
+        links = [cls(ancestor=category, descendant=category, depth=0)]
+        if category.parent_id:
+            links += [
+                cls(ancestor_id=ancestor_id, descendant=category, depth=depth + 1)
+                for ancestor_id, depth in cls.objects.filter(
+                    descendant_id=category.parent_id
+                ).values_list('ancestor_id', 'depth')
+            ]
+        cls.objects.bulk_create(links)
+
+    @classmethod
+    def move_subtree(cls, category):
+        subtree = dict(cls.objects.filter(ancestor=category).values_list('descendant_id', 'depth'))
+        # Detach the subtree from its old ancestors, keeping its internal links
+        cls.objects.filter(descendant_id__in=subtree).exclude(ancestor_id__in=subtree).delete()
+        if category.parent_id:
+            ancestors = cls.objects.filter(descendant_id=category.parent_id).values_list('ancestor_id', 'depth')
+            cls.objects.bulk_create([
+                cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + 1 + depth)
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, depth in subtree.items()
+            ])
+
+    class Meta:
+        unique_together = ['ancestor', 'descendant']
+        indexes = [models.Index(fields=['descendant', 'depth'], name='category_ancestors_idx')]
+
+class CourseQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(status='published')
+
+    def in_category_tree(self, category_id):
+        # One indexed join on the closure table instead of walking the tree
+        return self.filter(category__ancestor_links__ancestor_id=category_id)
+
+    def with_read_plan(self, relations=('lessons', 'lessons.materials')):
+        """
+        Load every relation CourseSerializer/CourseDetailSerializer will
+        serialize in a fixed number of queries. ``relations`` are the dotted
+        paths returned by SparseFieldsetMixin.get_expanded_relations.
+        """
+        queryset = self.select_related('teacher', 'category')
+        if 'lessons' in relations:
+            lessons = Lesson.objects.defer(*Lesson.OUTLINE_DEFERRED_FIELDS)
+            if 'lessons.materials' in relations:
+                lessons = lessons.prefetch_related('materials')
+            queryset = queryset.prefetch_related(models.Prefetch('lessons', queryset=lessons))
+        if 'reviews' in relations:
+            reviews = CourseReview.objects.order_by('-created_at', '-id')
+            if 'reviews.student' in relations:
+                reviews = reviews.select_related('student')
+            queryset = queryset.prefetch_related(models.Prefetch(
+                'reviews', queryset=reviews[:Course.RECENT_REVIEW_COUNT], to_attr='prefetched_recent_reviews'
+            ))
+        return queryset
+
+    def with_enrollment_count(self):
+        return self.annotate(
+            active_enrollment_count=models.Count(
+                'enrollments', filter=models.Q(enrollments__status='active')
+            )
+        )
+
 class Course(models.Model):
     DIFFICULTY_CHOICES = [
         ('beginner', 'Beginner'),
@@ -44,25 +169,94 @@ class Course(models.Model):
     # Calculated fields
     current_students = models.PositiveIntegerField(default=0)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+    # Running review aggregates, see apps.courses.ratings
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_1_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_2_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_3_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_4_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_5_count = models.PositiveIntegerField(default=0, editable=False)
+    # Kept by apps.courses.progress
+    published_lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    # Decayed activity score, see apps.courses.trending
+    trending_score = models.FloatField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Only ever changed with F() updates, never written back from a possibly stale instance
+    COUNTER_FIELDS = frozenset([
+        'current_students', 'published_lesson_count', 'rating', 'rating_sum', 'rating_count', 'rating_1_count', 'rating_2_count',
+        'rating_3_count', 'rating_4_count', 'rating_5_count', 'trending_score',
+    ])
+
+    RECENT_REVIEW_COUNT = 5
+
+    objects = CourseQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save tell edits that change the course's suggestion from others
+        instance._loaded_suggestion = instance.get_suggestion_fields()
+        return instance
+
+    def get_suggestion_fields(self):
+        return tuple(self.__dict__.get(name) for name in ('title', 'status', 'teacher_id'))
+
+    @property
+    def rating_histogram(self):
+        return {str(stars): getattr(self, f'rating_{stars}_count') for stars in range(1, 6)}
+
+    @property
+    def recent_reviews(self):
+        # Prefetched by CourseQuerySet.with_read_plan when serializing many courses
+        reviews = getattr(self, 'prefetched_recent_reviews', None)
+        if reviews is None:
+            reviews = list(
+                self.reviews.select_related('student').order_by('-created_at', '-id')[:self.RECENT_REVIEW_COUNT]
+            )
+        return reviews
+
     def update_student_count(self):
+        # Repairs the seat count, enrollments keep it current (apps.courses.enrollments)
         self.current_students = self.enrollments.filter(status='active').count()
         self.save(update_fields=['current_students'])
 
     def update_rating(self):
-        from django.db.models import Avg
-        avg_rating = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        self.rating = avg_rating or 0.00
-        self.save(update_fields=['rating'])
+        """
+        Recompute the review aggregates from scratch. Review writes keep them
+        current incrementally, this is only needed to repair them.
+        """
+        histogram = dict(
+            self.reviews.order_by().values_list('rating').annotate(models.Count('id'))
+        )
+        for stars in range(1, 6):
+            setattr(self, f'rating_{stars}_count', histogram.get(stars, 0))
+        self.rating_count = sum(histogram.values())
+        self.rating_sum = sum(stars * count for stars, count in histogram.items())
+        self.rating = round(self.rating_sum / self.rating_count, 2) if self.rating_count else 0
+        self.save(update_fields=[
+            field for field in self.COUNTER_FIELDS if field.startswith('rating')
+        ])
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', '-trending_score', '-id'], name='course_trending_idx'),
+        ]
 
 class Lesson(models.Model):
     LESSON_TYPE_CHOICES = [
@@ -71,6 +265,12 @@ class Lesson(models.Model):
         ('reading', 'Reading Material'),
         ('quiz', 'Quiz'),
     ]
+    # Orders are sort keys spread this far apart, so a lesson can be moved
+    # between two others by rewriting its own order only
+    ORDER_GAP = 1024
+    # Heavy columns left out of outlines and lesson lists, served by the
+    # lesson content endpoint instead
+    OUTLINE_DEFERRED_FIELDS = ('content',)
 
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lessons')
     title = models.CharField(max_length=200)
@@ -82,14 +282,40 @@ class Lesson(models.Model):
     video_url = models.URLField(blank=True)
     scheduled_at = models.DateTimeField(null=True, blank=True)
     is_published = models.BooleanField(default=False)
+    # Stable position of the lesson's bit in Enrollment.completion_bitmap
+    slot = models.PositiveIntegerField(editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        if not (self._state.adding and (self.order is None or self.slot is None)):
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Orders and completion bitmap slots are unique per course, the
+            # course row lock keeps concurrent creates from reading the same
+            # last ones
+            Course.objects.select_for_update().filter(pk=self.course_id).values_list('pk', flat=True).get()
+            last = Lesson.objects.filter(course_id=self.course_id).aggregate(
+                order=models.Max('order'), slot=models.Max('slot')
+            )
+            if self.order is None:
+                self.order = (last['order'] or 0) + self.ORDER_GAP
+            if self.slot is None:
+                self.slot = 0 if last['slot'] is None else last['slot'] + 1
+            super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save tell publishing and unpublishing from other edits
+        instance._loaded_is_published = instance.__dict__.get('is_published')
+        return instance
+
     class Meta:
         ordering = ['course', 'order']
-        unique_together = ['course', 'order']
+        unique_together = [['course', 'order'], ['course', 'slot']]
 
 class Enrollment(models.Model):
     STATUS_CHOICES = [
@@ -113,18 +339,30 @@ class Enrollment(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Completed lessons, kept by apps.courses.progress
+    completed_count = models.PositiveIntegerField(default=0, editable=False)
+    # Bit n is set when the lesson in slot n is completed
+    completion_bitmap = models.BinaryField(default=b'', editable=False)
 
     def __str__(self):
         return f"{self.student.get_full_name()} - {self.course.title}"
 
     def update_progress(self):
+        """
+        Recount the completed lessons and progress from scratch. Lesson
+        completions keep them current, this is only needed to repair them.
+        """
+        from .progress import make_bitmap
+
         total_lessons = self.course.lessons.filter(is_published=True).count()
+        slots = list(self.lesson_progress.filter(completed=True).values_list('lesson__slot', flat=True))
+        self.completed_count = len(slots)
+        self.completion_bitmap = make_bitmap(slots)
         if total_lessons == 0:
             self.progress_percentage = 0
         else:
-            completed_lessons = self.lesson_progress.filter(completed=True).count()
-            self.progress_percentage = (completed_lessons / total_lessons) * 100
-        self.save(update_fields=['progress_percentage'])
+            self.progress_percentage = min(self.completed_count / total_lessons * 100, 100)
+        self.save(update_fields=['completed_count', 'completion_bitmap', 'progress_percentage'])
 
     class Meta:
         unique_together = ['student', 'course']
@@ -135,10 +373,20 @@ class LessonProgress(models.Model):
     completed = models.BooleanField(default=False)
     completed_at = models.DateTimeField(null=True, blank=True)
     time_spent_minutes = models.PositiveIntegerField(default=0)
+    # Accumulated from heartbeats, see apps.courses.heartbeats
+    time_spent_seconds = models.PositiveIntegerField(default=0)
+    last_position_seconds = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.enrollment.student.get_full_name()} - {self.lesson.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save tell a new completion from a re-save
+        instance._loaded_completed = instance.__dict__.get('completed', False)
+        return instance
+
     class Meta:
         unique_together = ['enrollment', 'lesson']
 
@@ -153,10 +401,13 @@ class LessonMaterial(models.Model):
     def __str__(self):
         return f"{self.lesson.title} - {self.title}"
 
-    def save(self, *args, **kwargs):
+    def set_file_details(self):
         if self.file:
             self.file_size = self.file.size
             self.file_type = self.file.name.split('.')[-1].lower() if '.' in self.file.name else ''
+
+    def save(self, *args, **kwargs):
+        self.set_file_details()
         super().save(*args, **kwargs)
 
     class Meta:
@@ -176,5 +427,53 @@ class CourseReview(models.Model):
     def __str__(self):
         return f"{self.course.title} - {self.rating} stars"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets post_save move an edited rating between histogram buckets
+        instance._loaded_rating = instance.__dict__.get('rating')
+        return instance
+
+    class Meta:
+        unique_together = ['course', 'student']
+        indexes = [models.Index(fields=['course', '-created_at', '-id'], name='course_review_recent_idx')]
+
+class CourseSearchDocument(models.Model):
+    """
+    Denormalized search text for a published course. The database keeps the
+    actual index in sync from this row (a weighted tsvector with a GIN index
+    on PostgreSQL, an FTS5 table on SQLite), see apps/courses/search.py.
+    """
+    course = models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    teacher_name = models.CharField(max_length=300, blank=True)
+    category_name = models.CharField(max_length=100, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.title
+
+
+class CourseRecommendation(models.Model):
+    """
+    "Students also took" neighbours of a course, ranked by co-enrollment
+    similarity and rebuilt in bulk by apps.courses.recommendations
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='recommendations')
+    related_course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='recommended_for')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    def __str__(self):
+        return f"{self.course.title} -> {self.related_course.title}"
+
     class Meta:
-        unique_together = ['course', 'student']
\ No newline at end of file
+        ordering = ['course', 'rank']
+        unique_together = ['course', 'rank']
@@ -0,0 +1,117 @@
+"""
+Denormalized lesson progress.
+
+Courses keep the number of their published lessons and enrollments the
+number of lessons their student completed. Both only move with ``F()``
+updates as lessons are published, unpublished or completed, and each change
+rewrites the stored progress percentages it affects in the same statement,
+so reading progress never counts ``LessonProgress`` rows. Publishing or
+unpublishing a lesson updates every enrollment of its course with one
+``UPDATE``.
+
+Which lessons were completed is kept as a bitmap on the enrollment: every
+lesson has a stable ``slot`` in its course and bit ``slot`` of
+``completion_bitmap`` (little endian) is set once it is completed, so
+outlines with checkmarks are read from the enrollment row alone.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Least, NullIf
+from .models import Course, Enrollment, Lesson, LessonProgress
+
+
+def get_completed_slots(bitmap):
+    bits = int.from_bytes(bitmap or b'', 'little')
+    return [slot for slot in range(bits.bit_length()) if bits >> slot & 1]
+
+
+def make_bitmap(slots):
+    bits = 0
+    for slot in slots:
+        bits |= 1 << slot
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def get_progress_percentage(completed=F('completed_count')):
+    """
+    Progress percentage of the enrollments being updated, for ``completed``
+    lessons out of their course's published ones
+    """
+    published = Subquery(Course.objects.filter(pk=OuterRef('course_id')).values('published_lesson_count')[:1])
+    percentage = Cast(completed, FloatField()) * 100 / NullIf(published, 0)
+    # Completed lessons that were unpublished since may exceed the published count
+    return Cast(
+        Least(Coalesce(percentage, Value(0.0)), Value(100.0)),
+        DecimalField(max_digits=5, decimal_places=2)
+    )
+
+
+def get_completed_count():
+    return Coalesce(
+        Subquery(
+            LessonProgress.objects.filter(enrollment=OuterRef('pk'), completed=True)
+            .order_by().values('enrollment').annotate(count=Count('id')).values('count')
+        ),
+        0
+    )
+
+
+def record_completions(enrollment_id, slots, completed=True):
+    """
+    Mark the lessons in ``slots`` completed (or not) for an enrollment,
+    returns how many of them changed
+    """
+    with transaction.atomic():
+        # The bitmap is rewritten whole, the row lock keeps concurrent completions
+        bitmap = Enrollment.objects.select_for_update().values_list(
+            'completion_bitmap', flat=True
+        ).get(pk=enrollment_id)
+        old_bits = int.from_bytes(bytes(bitmap), 'little')
+        mask = int.from_bytes(make_bitmap(slots), 'little')
+        bits = old_bits | mask if completed else old_bits & ~mask
+        changed = bin(bits ^ old_bits).count('1')
+        if changed:
+            # Expressions read the row as it was before the UPDATE
+            count = F('completed_count') + (changed if completed else -changed)
+            Enrollment.objects.filter(pk=enrollment_id).update(
+                completion_bitmap=bits.to_bytes((bits.bit_length() + 7) // 8, 'little'),
+                completed_count=count,
+                progress_percentage=get_progress_percentage(count)
+            )
+    return changed
+
+
+def record_publication(course_id, delta):
+    Course.objects.filter(pk=course_id).update(published_lesson_count=F('published_lesson_count') + delta)
+    Enrollment.objects.filter(course_id=course_id).update(progress_percentage=get_progress_percentage())
+
+
+def recount_course_progress(course_id):
+    """
+    Recount a course's published lessons and rebuild its enrollments'
+    completions from scratch, e.g. after lessons and their progress were
+    deleted
+    """
+    Course.objects.filter(pk=course_id).update(published_lesson_count=Coalesce(
+        Subquery(
+            Lesson.objects.filter(course=OuterRef('pk'), is_published=True)
+            .order_by().values('course').annotate(count=Count('id')).values('count')
+        ),
+        0
+    ))
+    completed = get_completed_count()
+    Enrollment.objects.filter(course_id=course_id).update(
+        completed_count=completed, progress_percentage=get_progress_percentage(completed)
+    )
+
+    slots = defaultdict(list)
+    completions = LessonProgress.objects.filter(
+        enrollment__course_id=course_id, completed=True
+    ).values_list('enrollment_id', 'lesson__slot')
+    for enrollment_id, slot in completions.iterator():
+        slots[enrollment_id].append(slot)
+    enrollments = list(Enrollment.objects.filter(course_id=course_id).only('pk'))
+    for enrollment in enrollments:
+        enrollment.completion_bitmap = make_bitmap(slots[enrollment.pk])
+    Enrollment.objects.bulk_update(enrollments, ['completion_bitmap'], batch_size=500)
@@ -0,0 +1,44 @@
+"""
+Running review aggregates.
+
+Each course keeps the sum and count of its review ratings, a count per star
+and the resulting average. Review writes apply their difference with one
+UPDATE of F() expressions, so concurrent reviews never lose updates and no
+AVG over the reviews table is needed.
+"""
+from decimal import Decimal
+from django.db.models import Case, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from .models import Course
+
+
+def apply_rating_change(course_id, added=None, removed=None):
+    """
+    Record a review rating being added, removed, or changed (both given)
+    """
+    if added == removed:
+        return
+    sum_delta = (added or 0) - (removed or 0)
+    count_delta = (added is not None) - (removed is not None)
+
+    updates = {}
+    for stars, delta in ((added, 1), (removed, -1)):
+        if stars is not None:
+            field = f'rating_{stars}_count'
+            updates[field] = F(field) + delta
+    if count_delta:
+        updates['rating_count'] = F('rating_count') + count_delta
+    if sum_delta:
+        updates['rating_sum'] = F('rating_sum') + sum_delta
+
+    # Expressions read the row as it was before this UPDATE
+    new_count = F('rating_count') + count_delta
+    updates['rating'] = Case(
+        When(
+            rating_count__gt=-count_delta,
+            then=Cast(F('rating_sum') + sum_delta, FloatField()) / new_count,
+        ),
+        default=Value(Decimal('0.00')),
+        output_field=DecimalField(max_digits=3, decimal_places=2),
+    )
+    Course.objects.filter(pk=course_id).update(**updates)
@@ -0,0 +1,87 @@
+"""
+"Students also took" recommendations from the student x course enrollment
+matrix.
+
+The rebuild loads every (student, course) enrollment pair once, builds a
+sparse binary matrix X and computes course co-occurrence as ``X.T @ X``.
+Cosine similarity, ``shared / sqrt(students_a * students_b)``, is taken on
+the sparse result, and the best ``TOP_K`` neighbours of every course are
+picked with one sort over all non-zero entries. The table of neighbours is
+replaced in a single transaction, so serving is an indexed lookup on
+(course, rank).
+"""
+import itertools
+import numpy as np
+from scipy import sparse
+from django.db import transaction
+from .models import CourseRecommendation, Enrollment
+
+TOP_K = 12
+# Pairs of courses sharing fewer students are too noisy to recommend
+MIN_SHARED_STUDENTS = 2
+FETCH_CHUNK_SIZE = 10000
+
+
+def load_enrollment_pairs():
+    """
+    (student ids, course ids) arrays of enrollments in published courses
+    """
+    pairs = (
+        Enrollment.objects.exclude(status='cancelled')
+        .filter(course__status='published')
+        .order_by()
+        .values_list('student_id', 'course_id')
+    )
+    flat = np.fromiter(
+        itertools.chain.from_iterable(pairs.iterator(chunk_size=FETCH_CHUNK_SIZE)), dtype=np.int64
+    )
+    return flat[0::2], flat[1::2]
+
+
+def compute_neighbours(student_ids, course_ids, k=TOP_K, min_shared=MIN_SHARED_STUDENTS):
+    """
+    Top ``k`` cosine neighbours per course as parallel arrays of
+    (course id, neighbour id, rank, score)
+    """
+    empty = np.array([], dtype=np.int64)
+    if not len(course_ids):
+        return empty, empty, empty, np.array([], dtype=np.float64)
+
+    students, student_index = np.unique(student_ids, return_inverse=True)
+    courses, course_index = np.unique(course_ids, return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(course_index), dtype=np.float64), (student_index, course_index)),
+        shape=(len(students), len(courses)),
+    )
+    # Duplicate (student, course) pairs would count twice
+    matrix.data[:] = 1.0
+
+    shared = (matrix.T @ matrix).tocsr()
+    students_per_course = np.asarray(shared.diagonal())
+    shared.setdiag(0)
+    shared.data[shared.data < min_shared] = 0
+    shared.eliminate_zeros()
+
+    norms = sparse.diags(1.0 / np.sqrt(students_per_course))
+    similarity = (norms @ shared @ norms).tocoo()
+
+    # Sort by course, then best score first (ties by id), and keep the first k of each course
+    order = np.lexsort((similarity.col, -similarity.data, similarity.row))
+    rows, cols, scores = similarity.row[order], similarity.col[order], similarity.data[order]
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows, side='left')
+    keep = ranks < k
+    return courses[rows[keep]], courses[cols[keep]], ranks[keep] + 1, scores[keep]
+
+
+def rebuild_recommendations(k=TOP_K):
+    course_ids, related_ids, ranks, scores = compute_neighbours(*load_enrollment_pairs(), k=k)
+    recommendations = [
+        CourseRecommendation(course_id=course_id, related_course_id=related_id, rank=rank, score=score)
+        for course_id, related_id, rank, score in zip(
+            course_ids.tolist(), related_ids.tolist(), ranks.tolist(), scores.tolist()
+        )
+    ]
+    with transaction.atomic():
+        CourseRecommendation.objects.all().delete()
+        CourseRecommendation.objects.bulk_create(recommendations, batch_size=5000)
+    return len(recommendations)
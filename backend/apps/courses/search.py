@@ -0,0 +1,235 @@
+"""
+Ranked full-text search over published courses.
+
+Every published course has a CourseSearchDocument row holding its title,
+description, teacher name and category name. The database indexes that row
+with triggers installed by the 0003 migration:
+
+* PostgreSQL: a weighted tsvector (title A, description B, teacher and
+  category C) in ``search_vector`` with a GIN index.
+* SQLite: an external content FTS5 table, ranked with column weighted bm25.
+
+Other databases fall back to ``icontains`` matching. Query terms that do not
+appear in the indexed vocabulary are expanded with their closest spellings,
+which gives some tolerance for typos.
+"""
+import bisect
+import difflib
+import re
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils.html import escape
+from .models import CourseSearchDocument
+
+SEARCH_CONFIG = 'english'
+FTS_TABLE = 'courses_coursesearch_fts'
+MAX_QUERY_TERMS = 8
+MAX_RESULTS = 500
+MIN_TYPO_LENGTH = 4
+VOCABULARY_CACHE_KEY = 'courses:search:vocabulary'
+VOCABULARY_TIMEOUT = 60 * 10
+
+# Private use characters mark matches until the text is escaped
+MARK_START, MARK_END = '\ue000', '\ue001'
+WORD_RE = re.compile(r'\w+')
+
+
+def build_search_document(course):
+    return {
+        'title': course.title,
+        'description': course.description,
+        'teacher_name': course.teacher.get_full_name(),
+        'category_name': course.category.name,
+    }
+
+
+def index_course(course):
+    """
+    Create, refresh or drop the search document of a single course
+    """
+    if course.status == 'published':
+        CourseSearchDocument.objects.update_or_create(
+            course=course, defaults=build_search_document(course)
+        )
+    else:
+        CourseSearchDocument.objects.filter(course=course).delete()
+    cache.delete(VOCABULARY_CACHE_KEY)
+
+
+def rebuild_index(courses):
+    CourseSearchDocument.objects.all().delete()
+    for course in courses.filter(status='published').select_related('teacher', 'category').iterator():
+        CourseSearchDocument.objects.create(course=course, **build_search_document(course))
+    cache.delete(VOCABULARY_CACHE_KEY)
+
+
+def get_vocabulary():
+    """
+    Sorted list of every indexed word, used for typo correction
+    """
+    vocabulary = cache.get(VOCABULARY_CACHE_KEY)
+    if vocabulary is None:
+        words = set()
+        rows = CourseSearchDocument.objects.values_list(
+            'title', 'description', 'teacher_name', 'category_name'
+        )
+        for row in rows.iterator():
+            for text in row:
+                words.update(WORD_RE.findall(text.lower()))
+        vocabulary = sorted(words)
+        cache.set(VOCABULARY_CACHE_KEY, vocabulary, VOCABULARY_TIMEOUT)
+    return vocabulary
+
+
+def _is_known_prefix(vocabulary, term):
+    index = bisect.bisect_left(vocabulary, term)
+    return index < len(vocabulary) and vocabulary[index].startswith(term)
+
+
+def parse_query(text):
+    """
+    Split a user query into term groups. Each group lists the term followed
+    by its likely intended spellings, e.g. [['pyton', 'python'], ['basics']].
+    """
+    terms = WORD_RE.findall(text.lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return []
+
+    vocabulary = get_vocabulary()
+    groups = []
+    for term in terms:
+        group = [term]
+        if len(term) >= MIN_TYPO_LENGTH and not _is_known_prefix(vocabulary, term):
+            candidates = [word for word in vocabulary if abs(len(word) - len(term)) <= 2]
+            group += difflib.get_close_matches(term, candidates, n=2, cutoff=0.75)
+        groups.append(group)
+    return groups
+
+
+def render_highlight(text):
+    if not text:
+        return text
+    return escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+class PostgresSearchBackend:
+    def get_query(self, terms):
+        raw = ' & '.join(
+            '(' + ' | '.join(f'{term}:*' for term in group) + ')' for group in terms
+        )
+        return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+    def search(self, terms, limit=MAX_RESULTS):
+        query = self.get_query(terms)
+        return list(
+            CourseSearchDocument.objects.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-course_id')
+            .values_list('course_id', flat=True)[:limit]
+        )
+
+    def highlight(self, terms, course_ids):
+        query = self.get_query(terms)
+        options = {'config': SEARCH_CONFIG, 'start_sel': MARK_START, 'stop_sel': MARK_END}
+        rows = CourseSearchDocument.objects.filter(course_id__in=course_ids).annotate(
+            title_highlight=SearchHeadline('title', query, highlight_all=True, **options),
+            description_highlight=SearchHeadline(
+                'description', query, max_words=35, min_words=15, **options
+            ),
+        ).values_list('course_id', 'title_highlight', 'description_highlight')
+        return {
+            course_id: {'title': render_highlight(title), 'description': render_highlight(description)}
+            for course_id, title, description in rows
+        }
+
+
+class SqliteSearchBackend:
+    # bm25 weights for title, description, teacher_name, category_name
+    weights = (10.0, 4.0, 1.0, 1.0)
+
+    def get_query(self, terms):
+        return ' AND '.join(
+            '(' + ' OR '.join(f'"{term}"*' for term in group) + ')' for group in terms
+        )
+
+    def search(self, terms, limit=MAX_RESULTS):
+        weights = ', '.join(str(weight) for weight in self.weights)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}), rowid DESC LIMIT %s',
+                [self.get_query(terms), limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def highlight(self, terms, course_ids):
+        if not course_ids:
+            return {}
+        placeholders = ', '.join(['%s'] * len(course_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s), '
+                f'snippet({FTS_TABLE}, 1, %s, %s, %s, 24) '
+                f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid IN ({placeholders})',
+                [MARK_START, MARK_END, MARK_START, MARK_END, '…', self.get_query(terms), *course_ids]
+            )
+            return {
+                course_id: {'title': render_highlight(title), 'description': render_highlight(description)}
+                for course_id, title, description in cursor.fetchall()
+            }
+
+
+class SimpleSearchBackend:
+    """
+    Unindexed fallback for databases without full-text support
+    """
+    fields = ('title', 'description', 'teacher_name', 'category_name')
+
+    def search(self, terms, limit=MAX_RESULTS):
+        documents = CourseSearchDocument.objects.all()
+        score = Value(0)
+        for group in terms:
+            matches = Q()
+            for term in group:
+                for field in self.fields:
+                    matches |= Q(**{f'{field}__icontains': term})
+            documents = documents.filter(matches)
+            for weight, field in zip((8, 4, 1, 1), self.fields):
+                field_matches = Q()
+                for term in group:
+                    field_matches |= Q(**{f'{field}__icontains': term})
+                score = score + Case(
+                    When(field_matches, then=Value(weight)), default=Value(0),
+                    output_field=IntegerField()
+                )
+        return list(
+            documents.annotate(rank=score)
+            .order_by('-rank', '-course_id')
+            .values_list('course_id', flat=True)[:limit]
+        )
+
+    def highlight(self, terms, course_ids):
+        pattern = re.compile(
+            '|'.join(re.escape(term) for group in terms for term in group), re.IGNORECASE
+        )
+
+        def mark(text):
+            return render_highlight(pattern.sub(lambda m: MARK_START + m.group(0) + MARK_END, text))
+
+        rows = CourseSearchDocument.objects.filter(course_id__in=course_ids).values_list(
+            'course_id', 'title', 'description'
+        )
+        return {
+            course_id: {'title': mark(title), 'description': mark(description)}
+            for course_id, title, description in rows
+        }
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteSearchBackend()
+    return SimpleSearchBackend()
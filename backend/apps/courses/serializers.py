@@ -1,39 +1,104 @@
 from rest_framework import serializers
+from django.contrib.auth import get_user_model
+from django.db import models
+from .heartbeats import MAX_HEARTBEAT_SECONDS
 from .models import Category, Course, Lesson, Enrollment, LessonProgress, CourseReview, LessonMaterial
 from apps.authentication.serializers import UserProfileSerializer
+from apps.core.serializers import SparseFieldsetMixin
+from .search import get_search_backend
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     course_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'description', 'course_count', 'created_at']
+        fields = ['id', 'name', 'description', 'parent', 'course_count', 'created_at']
+
+    def validate_parent(self, parent):
+        if parent and self.instance and self.instance.is_ancestor_of(parent.pk):
+            raise serializers.ValidationError("A category cannot be moved under its own subtree")
+        return parent
 
     def get_course_count(self, obj):
-        return obj.courses.filter(status='published').count()
+        # Published courses in the category and its subcategories
+        if hasattr(obj, 'published_course_count'):
+            return obj.published_course_count
+        return Course.objects.published().in_category_tree(obj.pk).count()
 
-class LessonMaterialSerializer(serializers.ModelSerializer):
+class LessonMaterialSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = LessonMaterial
         fields = ['id', 'title', 'file', 'file_type', 'file_size', 'created_at']
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     materials = LessonMaterialSerializer(many=True, read_only=True)
+    is_completed = serializers.SerializerMethodField()
     
     class Meta:
         model = Lesson
         fields = [
             'id', 'title', 'description', 'lesson_type', 'order',
             'duration_minutes', 'content', 'video_url', 'scheduled_at',
-            'is_published', 'created_at', 'materials'
+            'is_published', 'created_at', 'materials', 'is_completed'
         ]
+        # New lessons go after the last one unless given an order
+        extra_kwargs = {'order': {'required': False}}
+        expandable_fields = ['materials']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Only known when listing lessons for an enrolled student
+        if 'completed_slots' not in self.context:
+            fields.pop('is_completed', None)
+        # Lists and nested lessons are outlines, content has its own endpoint
+        if self.parent is not None:
+            for name in Lesson.OUTLINE_DEFERRED_FIELDS:
+                fields.pop(name, None)
+        return fields
+
+    def get_is_completed(self, obj):
+        return obj.slot in self.context['completed_slots']
+
+def preload_enrollment_statuses(context, course_ids):
+    """
+    Resolve the requesting user's enrollment status for every course in
+    ``course_ids`` with one query and remember it in the serializer context
+    """
+    statuses = context.setdefault('enrollment_statuses', {})
+    request = context.get('request')
+    if not (request and request.user.is_authenticated):
+        return statuses
+
+    missing = [course_id for course_id in course_ids if course_id not in statuses]
+    if missing:
+        statuses.update(dict.fromkeys(missing))
+        statuses.update(
+            Enrollment.objects.filter(
+                student=request.user,
+                course_id__in=missing
+            ).values_list('course_id', 'status')
+        )
+    return statuses
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        courses = data.all() if isinstance(data, models.Manager) else data
+        courses = list(courses)
+        if {'is_enrolled', 'enrollment_status'} & set(self.child.fields):
+            preload_enrollment_statuses(self.context, [course.pk for course in courses])
+        if 'search_highlight' in self.child.fields:
+            self.context['search_highlights'] = get_search_backend().highlight(
+                self.context['search_terms'], [course.pk for course in courses]
+            )
+        return super().to_representation(courses)
+
+class CourseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     teacher_name = serializers.CharField(source='teacher.get_full_name', read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     lessons = LessonSerializer(many=True, read_only=True)
     is_enrolled = serializers.SerializerMethodField()
     enrollment_status = serializers.SerializerMethodField()
+    search_highlight = serializers.SerializerMethodField()
 
     class Meta:
         model = Course
@@ -42,29 +107,45 @@ class CourseSerializer(serializers.ModelSerializer):
             'category', 'category_name', 'thumbnail', 'difficulty_level',
             'duration_weeks', 'max_students', 'current_students', 'status',
             'price', 'rating', 'lessons', 'is_enrolled', 'enrollment_status',
-            'created_at', 'updated_at'
+            'search_highlight', 'created_at', 'updated_at'
         ]
         read_only_fields = ['current_students', 'rating']
+        list_serializer_class = CourseListSerializer
+        expandable_fields = ['lessons']
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # Highlights only exist for search results
+        if not self.context.get('search_terms'):
+            fields.pop('search_highlight', None)
+        return fields
+
+    def _get_enrollment_status(self, obj):
+        return preload_enrollment_statuses(self.context, [obj.pk]).get(obj.pk)
 
     def get_is_enrolled(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Enrollment.objects.filter(
-                student=request.user, 
-                course=obj, 
-                status='active'
-            ).exists()
-        return False
+        return self._get_enrollment_status(obj) == 'active'
 
     def get_enrollment_status(self, obj):
-        request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            enrollment = Enrollment.objects.filter(
-                student=request.user, 
-                course=obj
-            ).first()
-            return enrollment.status if enrollment else None
-        return None
+        return self._get_enrollment_status(obj)
+
+    def get_search_highlight(self, obj):
+        return self.context.get('search_highlights', {}).get(obj.pk)
+
+class CourseCardSerializer(serializers.ModelSerializer):
+    """
+    Compact, user independent course representation for cards
+    """
+    teacher_name = serializers.CharField(source='teacher.get_full_name', read_only=True)
+    category_name = serializers.CharField(source='category.name', read_only=True)
+
+    class Meta:
+        model = Course
+        fields = [
+            'id', 'title', 'teacher', 'teacher_name', 'category', 'category_name',
+            'thumbnail', 'difficulty_level', 'duration_weeks', 'price', 'rating',
+            'current_students', 'max_students', 'status'
+        ]
 
 class CourseCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -81,7 +162,26 @@ class CourseCreateSerializer(serializers.ModelSerializer):
         # The model's default status ('draft') will be used if not provided
         return super().create(validated_data)
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        enrollments = data.all() if isinstance(data, models.Manager) else data
+        enrollments = list(enrollments)
+        if not isinstance(self.child.fields.get('course'), CourseSerializer):
+            return super().to_representation(enrollments)
+
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            # The requesting student's own enrollments already carry the status
+            statuses = self.context.setdefault('enrollment_statuses', {})
+            for enrollment in enrollments:
+                if enrollment.student_id == request.user.pk:
+                    statuses[enrollment.course_id] = enrollment.status
+        preload_enrollment_statuses(
+            self.context, [enrollment.course_id for enrollment in enrollments]
+        )
+        return super().to_representation(enrollments)
+
+class EnrollmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     course = CourseSerializer(read_only=True)
     student = UserProfileSerializer(read_only=True)
 
@@ -91,29 +191,76 @@ class EnrollmentSerializer(serializers.ModelSerializer):
             'id', 'student', 'course', 'enrolled_at', 'status',
             'progress_percentage', 'completed_at'
         ]
+        list_serializer_class = EnrollmentListSerializer
+        expandable_fields = ['course', 'student']
+
+class LessonBatchSerializer(serializers.Serializer):
+    # Lesson fields, entries with the id of one of the course's lessons update it
+    lessons = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=200)
+
+class LessonMoveSerializer(serializers.Serializer):
+    # Lesson to move after, null to move first
+    after = serializers.IntegerField(allow_null=True)
 
-class LessonProgressSerializer(serializers.ModelSerializer):
+class RosterEnrollmentSerializer(serializers.Serializer):
+    # Student ids or emails
+    students = serializers.ListField(
+        child=serializers.CharField(max_length=254), allow_empty=False, max_length=500
+    )
+
+class LessonCompletionSerializer(serializers.Serializer):
+    lesson_id = serializers.IntegerField()
+    completed_at = serializers.DateTimeField(required=False)
+    # Minutes the client recorded on the lesson
+    time_spent = serializers.IntegerField(min_value=0, required=False, default=0)
+
+class LessonHeartbeatSerializer(serializers.Serializer):
+    # Seconds of activity since the previous heartbeat
+    elapsed_seconds = serializers.IntegerField(min_value=0, max_value=MAX_HEARTBEAT_SECONDS)
+    position_seconds = serializers.IntegerField(min_value=0, required=False)
+
+class LessonProgressSyncSerializer(serializers.Serializer):
+    completions = LessonCompletionSerializer(many=True, allow_empty=False, max_length=500)
+
+class LessonProgressSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     lesson = LessonSerializer(read_only=True)
 
     class Meta:
         model = LessonProgress
         fields = [
-            'id', 'lesson', 'completed', 'completed_at', 'time_spent_minutes'
+            'id', 'lesson', 'completed', 'completed_at', 'time_spent_minutes',
+            'time_spent_seconds', 'last_position_seconds'
         ]
+        expandable_fields = ['lesson']
 
-class CourseReviewSerializer(serializers.ModelSerializer):
-    student = UserProfileSerializer(read_only=True)
+class ReviewerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    full_name = serializers.ReadOnlyField()
+
+    class Meta:
+        model = get_user_model()
+        fields = ['id', 'full_name', 'profile_picture']
+
+class CourseReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    student = ReviewerSerializer(read_only=True)
 
     class Meta:
         model = CourseReview
         fields = ['id', 'student', 'rating', 'comment', 'created_at']
+        expandable_fields = ['student']
 
 class CourseDetailSerializer(CourseSerializer):
-    reviews = CourseReviewSerializer(many=True, read_only=True)
+    # Only the newest reviews, the rest are paged through the reviews endpoint
+    reviews = CourseReviewSerializer(many=True, read_only=True, source='recent_reviews')
+    rating_histogram = serializers.ReadOnlyField()
     enrollment_count = serializers.SerializerMethodField()
 
     class Meta(CourseSerializer.Meta):
-        fields = CourseSerializer.Meta.fields + ['reviews', 'enrollment_count']
+        fields = CourseSerializer.Meta.fields + [
+            'rating_count', 'rating_histogram', 'reviews', 'enrollment_count'
+        ]
+        expandable_fields = CourseSerializer.Meta.expandable_fields + ['reviews']
 
     def get_enrollment_count(self, obj):
+        if hasattr(obj, 'active_enrollment_count'):
+            return obj.active_enrollment_count
         return obj.enrollments.filter(status='active').count()
\ No newline at end of file
@@ -0,0 +1,160 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.db import transaction
+from django.db.models import Q
+from apps.core.cache import bump_cache_version
+from .cache import get_progress_namespace, invalidate_catalog, invalidate_lesson_content
+from .documents import invalidate_course_documents
+from .membership import invalidate_memberships
+from .models import (
+    Category, Course, CourseReview, CourseSearchDocument, Enrollment, Lesson, LessonMaterial,
+    LessonProgress
+)
+from .progress import record_completions, record_publication, recount_course_progress
+from .ratings import apply_rating_change
+from .search import index_course
+from .trending import record_event
+from .typeahead import typeahead_index
+
+
+# Registered first so caches invalidated below never see the old aggregates
+@receiver(post_save, sender=CourseReview)
+def review_saved(sender, instance, created, **kwargs):
+    removed = None if created else getattr(instance, '_loaded_rating', None)
+    apply_rating_change(instance.course_id, added=instance.rating, removed=removed)
+    instance._loaded_rating = instance.rating
+
+
+@receiver(post_delete, sender=CourseReview)
+def review_deleted(sender, instance, **kwargs):
+    apply_rating_change(instance.course_id, removed=instance.rating)
+
+
+@receiver(post_save, sender=Course)
+def update_course_search_document(sender, instance, **kwargs):
+    index_course(instance)
+    # Course.save lists every field in update_fields, compare with the loaded values
+    suggestion = instance.get_suggestion_fields()
+    if suggestion != getattr(instance, '_loaded_suggestion', None):
+        typeahead_index.course_changed(instance)
+    instance._loaded_suggestion = suggestion
+
+
+@receiver(post_delete, sender=Course)
+def remove_course_suggestion(sender, instance, **kwargs):
+    typeahead_index.course_removed(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Course)
+@receiver([post_save, post_delete], sender=Lesson)
+@receiver([post_save, post_delete], sender=LessonMaterial)
+@receiver([post_save, post_delete], sender=CourseReview)
+def catalog_changed(sender, **kwargs):
+    invalidate_catalog()
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_document_changed(sender, instance, **kwargs):
+    invalidate_course_documents([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+@receiver([post_save, post_delete], sender=CourseReview)
+@receiver([post_save, post_delete], sender=Enrollment)
+def course_document_part_changed(sender, instance, **kwargs):
+    invalidate_course_documents([instance.course_id])
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_content_changed(sender, instance, update_fields=None, **kwargs):
+    # Moves save the order only, the cached content stays valid
+    if update_fields is None or 'content' in update_fields:
+        invalidate_lesson_content([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=LessonMaterial)
+def lesson_material_changed(sender, instance, **kwargs):
+    invalidate_course_documents(
+        Lesson.objects.filter(pk=instance.lesson_id).values_list('course_id', flat=True)
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_profile_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    # Course documents embed the teacher's name and each reviewer's profile
+    invalidate_course_documents(
+        Course.objects.filter(Q(teacher=instance) | Q(reviews__student=instance))
+        .values_list('pk', flat=True).distinct()
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_teacher_search_documents(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not {'first_name', 'last_name'} & set(update_fields):
+        return
+    if instance.user_type == 'teacher':
+        # Course payloads carry the teacher's name
+        invalidate_catalog()
+        typeahead_index.teacher_renamed(instance)
+    stale = CourseSearchDocument.objects.filter(course__teacher=instance).exclude(
+        teacher_name=instance.get_full_name()
+    ).select_related('course__teacher', 'course__category')
+    for document in stale:
+        index_course(document.course)
+
+
+@receiver(post_save, sender=Category)
+def update_category_search_documents(sender, instance, **kwargs):
+    stale = CourseSearchDocument.objects.filter(course__category=instance).exclude(
+        category_name=instance.name
+    ).select_related('course__teacher', 'course__category')
+    for document in stale:
+        index_course(document.course)
+    invalidate_course_documents(instance.courses.values_list('pk', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    invalidate_memberships([instance.student_id])
+
+
+@receiver(post_save, sender=Enrollment)
+def enrollment_trending(sender, instance, created, **kwargs):
+    if created:
+        record_event(instance.course_id, 'enrollment', instance.enrolled_at)
+
+
+@receiver(post_save, sender=CourseReview)
+def review_trending(sender, instance, created, **kwargs):
+    if created:
+        record_event(instance.course_id, 'review', instance.created_at)
+
+
+@receiver(post_save, sender=LessonProgress)
+def lesson_completion_changed(sender, instance, **kwargs):
+    if instance.completed == getattr(instance, '_loaded_completed', False):
+        return
+    instance._loaded_completed = instance.completed
+    record_completions(instance.enrollment_id, [instance.lesson.slot], instance.completed)
+    namespace = get_progress_namespace(instance.enrollment.course_id, instance.enrollment.student_id)
+    transaction.on_commit(lambda: bump_cache_version(namespace))
+    if instance.completed:
+        record_event(instance.enrollment.course_id, 'completion', instance.completed_at)
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_publication_changed(sender, instance, created, **kwargs):
+    was_published = False if created else getattr(instance, '_loaded_is_published', instance.is_published)
+    if instance.is_published != was_published:
+        record_publication(instance.course_id, 1 if instance.is_published else -1)
+    instance._loaded_is_published = instance.is_published
+
+
+@receiver(post_delete, sender=Lesson)
+def lesson_deleted(sender, instance, **kwargs):
+    # The lesson's progress rows are gone by now, recount rather than track each
+    recount_course_progress(instance.course_id)
@@ -0,0 +1,32 @@
+from celery import shared_task
+from django.core.cache import cache
+from .cache import get_course_namespace
+from .documents import store_course_document
+
+
+@shared_task(ignore_result=True)
+def rebuild_course_document(course_id):
+    # Clear the flag first so changes made while building queue another rebuild
+    cache.delete(f'{get_course_namespace(course_id)}:rebuild-queued')
+    store_course_document(course_id)
+
+
+@shared_task(ignore_result=True)
+def rebuild_course_recommendations():
+    from .recommendations import rebuild_recommendations
+
+    rebuild_recommendations()
+
+
+@shared_task(ignore_result=True)
+def flush_lesson_heartbeats():
+    from .heartbeats import flush_heartbeats
+
+    flush_heartbeats()
+
+
+@shared_task(ignore_result=True)
+def rebalance_course_lessons(course_id):
+    from .lessons import rebalance_lesson_orders
+
+    rebalance_lesson_orders(course_id)
@@ -0,0 +1,65 @@
+"""
+Time-decayed trending scores.
+
+A course's trending score is the sum of its recent events (enrollments,
+lesson completions, reviews), each weighing half as much every
+``TRENDING_HALF_LIFE``. Instead of decaying every stored score as time goes
+by, each event is scaled up by ``2 ** (age of TRENDING_EPOCH at the event /
+half-life)``. All scores would shrink by the same factor, so they order
+courses exactly like the decayed values and a single indexed column serves
+``?ordering=-trending_score``.
+
+Scaled weights double every half-life and would leave the float range
+within decades, so the column keeps the base 2 logarithm of the scaled sum,
+which grows by one per half-life. Logarithms keep the order, and adding an
+event is a log-sum-exp in one ``UPDATE``:
+``max(a, b) + log2(1 + 2 ** (min(a, b) - max(a, b)))``. A course without
+events stores 0, a weight of 1 at the epoch, long decayed to nothing.
+"""
+import datetime
+import math
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Greatest, Least, Ln, Power
+from django.utils import timezone
+from .models import Course
+
+TRENDING_EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+TRENDING_HALF_LIFE = datetime.timedelta(days=7)
+EVENT_WEIGHTS = {
+    'enrollment': 3.0,
+    'review': 2.0,
+    'completion': 1.0,
+}
+
+
+def get_epoch_age(when):
+    """
+    Half-lives elapsed between ``TRENDING_EPOCH`` and ``when``
+    """
+    return (when - TRENDING_EPOCH) / TRENDING_HALF_LIFE
+
+
+def get_log_weight(event, when=None, count=1):
+    return math.log2(EVENT_WEIGHTS[event] * count) + get_epoch_age(when or timezone.now())
+
+
+def add_log_scores(score, weight):
+    """
+    Expression for ``log2(2 ** score + 2 ** weight)`` that never leaves the
+    float range
+    """
+    high = Greatest(score, weight)
+    low = Least(score, weight)
+    return high + Ln(Value(1.0) + Power(Value(2.0), low - high)) / Value(math.log(2))
+
+
+def record_event(course_id, event, when=None, count=1):
+    weight = Value(get_log_weight(event, when, count), output_field=FloatField())
+    Course.objects.filter(pk=course_id).update(trending_score=add_log_scores(F('trending_score'), weight))
+
+
+def get_trending_score(course, now=None):
+    """
+    Current decayed score, e.g. for display
+    """
+    return 2 ** (course.trending_score - get_epoch_age(now or timezone.now()))
@@ -0,0 +1,182 @@
+"""
+In-process prefix index for search-as-you-type over published course titles
+and the teachers who publish them.
+
+Every word of a title or name is kept in a sorted list of (word, entry)
+pairs, so the words starting with a prefix form one contiguous slice found
+with ``bisect``. Lookups never touch the database: each process loads the
+index once, updates it incrementally as courses are published, unpublished
+or renamed, and reloads it when another process changed the catalog (seen
+through a shared version checked every few seconds).
+"""
+import bisect
+import threading
+import time
+import unicodedata
+from django.db import transaction
+from apps.core.cache import bump_cache_version, get_cache_version
+from .models import Course
+
+TYPEAHEAD_NAMESPACE = 'courses:typeahead'
+VERSION_CHECK_INTERVAL = 5
+MAX_CANDIDATES = 200
+# Sorts after every character a normalized word can contain
+HIGHEST = '\U0010ffff'
+
+
+def normalize_words(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ''.join(char if char.isalnum() else ' ' for char in text).split()
+
+
+class TypeaheadIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+        self._checked_at = 0.0
+        self._words = []
+        self._entries = {}
+        self._course_teachers = {}
+        self._teacher_courses = {}
+
+    # Reads
+
+    def suggest(self, query, limit=8):
+        terms = normalize_words(query)
+        if not terms:
+            return []
+        self._ensure_current()
+
+        words, entries = self._words, self._entries
+        # Candidates come from the longest term, the others filter them
+        anchor = max(terms, key=len)
+        start = bisect.bisect_left(words, (anchor,))
+        stop = bisect.bisect_left(words, (anchor + HIGHEST,), start)
+        keys = dict.fromkeys(key for _, key in words[start:min(stop, start + MAX_CANDIDATES)])
+
+        matches = []
+        for key in keys:
+            entry = entries.get(key)
+            if entry is None:
+                continue
+            suggestion, entry_words = entry
+            if all(any(word.startswith(term) for word in entry_words) for term in terms):
+                starts = entry_words[0].startswith(terms[0])
+                matches.append((not starts, key[0] != 'course', len(suggestion['label']), key, suggestion))
+        matches.sort(key=lambda match: match[:4])
+        return [match[4] for match in matches[:limit]]
+
+    # Loading
+
+    def _ensure_current(self):
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        version = get_cache_version(TYPEAHEAD_NAMESPACE)
+        with self._lock:
+            self._checked_at = now
+            if not self._loaded or version != self._version:
+                self._load(version)
+
+    def _load(self, version):
+        courses = Course.objects.published().select_related('teacher').only(
+            'id', 'title', 'teacher__id', 'teacher__first_name', 'teacher__last_name'
+        )
+        # Build aside and swap, readers keep using the old index meanwhile
+        fresh = TypeaheadIndex()
+        for course in courses.iterator():
+            fresh._add_course(course.pk, course.title, course.teacher_id, course.teacher.get_full_name())
+        fresh._words.sort()
+        self._words, self._entries = fresh._words, fresh._entries
+        self._course_teachers, self._teacher_courses = fresh._course_teachers, fresh._teacher_courses
+        self._version, self._loaded = version, True
+
+    # Incremental updates, applied under the lock. suggest() bisects the word
+    # list without it, so a changed list is swapped in, never edited in place.
+
+    def _put(self, key, label, suggestion):
+        self._remove(key)
+        words = normalize_words(label)
+        self._entries[key] = (suggestion, words)
+        if not self._loaded:
+            # Still being built aside by _load, which sorts it once
+            self._words.extend((word, key) for word in set(words))
+            return
+        updated = list(self._words)
+        for word in set(words):
+            bisect.insort(updated, (word, key))
+        self._words = updated
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        updated = list(self._words)
+        for word in set(entry[1]):
+            index = bisect.bisect_left(updated, (word, key))
+            if index < len(updated) and updated[index] == (word, key):
+                del updated[index]
+        self._words = updated
+
+    def _add_course(self, course_id, title, teacher_id, teacher_name):
+        if self._course_teachers.get(course_id) not in (None, teacher_id):
+            self._remove_course(course_id)
+        suggestion = {'type': 'course', 'id': course_id, 'label': title, 'teacher_name': teacher_name}
+        self._put(('course', course_id), title, suggestion)
+        self._course_teachers[course_id] = teacher_id
+        self._teacher_courses.setdefault(teacher_id, set()).add(course_id)
+        self._put_teacher(teacher_id, teacher_name)
+
+    def _put_teacher(self, teacher_id, teacher_name):
+        entry = self._entries.get(('teacher', teacher_id))
+        if entry is None or entry[0]['label'] != teacher_name:
+            self._put(('teacher', teacher_id), teacher_name, {'type': 'teacher', 'id': teacher_id, 'label': teacher_name})
+
+    def _remove_course(self, course_id):
+        self._remove(('course', course_id))
+        teacher_id = self._course_teachers.pop(course_id, None)
+        course_ids = self._teacher_courses.get(teacher_id)
+        if course_ids is not None:
+            course_ids.discard(course_id)
+            if not course_ids:
+                del self._teacher_courses[teacher_id]
+                self._remove(('teacher', teacher_id))
+
+    def _rename_teacher(self, teacher_id, teacher_name):
+        for course_id in self._teacher_courses.get(teacher_id, ()):
+            suggestion, words = self._entries[('course', course_id)]
+            suggestion = {**suggestion, 'teacher_name': teacher_name}
+            self._entries[('course', course_id)] = (suggestion, words)
+        if teacher_id in self._teacher_courses:
+            self._put_teacher(teacher_id, teacher_name)
+
+    def _apply(self, change, *args):
+        version = bump_cache_version(TYPEAHEAD_NAMESPACE)
+        with self._lock:
+            if not self._loaded:
+                return
+            if version == self._version + 1:
+                # Nothing else changed since this process loaded the index
+                change(*args)
+                self._version = version
+            else:
+                self._checked_at = 0.0
+
+    def course_changed(self, course):
+        if course.status == 'published':
+            args = (course.pk, course.title, course.teacher_id, course.teacher.get_full_name())
+            transaction.on_commit(lambda: self._apply(self._add_course, *args))
+        else:
+            self.course_removed(course.pk)
+
+    def course_removed(self, course_id):
+        transaction.on_commit(lambda: self._apply(self._remove_course, course_id))
+
+    def teacher_renamed(self, teacher):
+        args = (teacher.pk, teacher.get_full_name())
+        transaction.on_commit(lambda: self._apply(self._rename_teacher, *args))
+
+
+typeahead_index = TypeaheadIndex()
@@ -7,14 +7,24 @@ urlpatterns = [
     
     # Courses
     path('courses/', views.CourseListCreateView.as_view(), name='course-list-create'),
+    path('courses/autocomplete/', views.course_autocomplete, name='course-autocomplete'),
+    path('courses/batch/', views.CourseBatchView.as_view(), name='course-batch'),
+    path('courses/facets/', views.CourseFacetsView.as_view(), name='course-facets'),
     path('courses/<int:pk>/', views.CourseDetailView.as_view(), name='course-detail'),
     path('courses/<int:course_id>/enroll/', views.enroll_course, name='enroll-course'),
     path('courses/<int:course_id>/unenroll/', views.unenroll_course, name='unenroll-course'),
+    path('courses/<int:course_id>/roster/', views.enroll_roster, name='enroll-roster'),
+    path('courses/<int:course_id>/related/', views.RelatedCoursesView.as_view(), name='related-courses'),
     path('courses/<int:course_id>/lessons/', views.LessonListCreateView.as_view(), name='lesson-list-create'),
+    path('courses/<int:course_id>/lessons/bulk/', views.save_lesson_batch, name='lesson-batch'),
     
     # Lessons
     path('lessons/<int:pk>/', views.LessonDetailView.as_view(), name='lesson-detail'),
+    path('lessons/sync-progress/', views.sync_lesson_progress, name='sync-lesson-progress'),
+    path('lessons/<int:pk>/content/', views.LessonContentView.as_view(), name='lesson-content'),
+    path('lessons/<int:pk>/move/', views.reorder_lesson, name='move-lesson'),
     path('lessons/<int:pk>/complete/', views.mark_lesson_complete, name='mark-lesson-complete'),
+    path('lessons/<int:pk>/heartbeat/', views.lesson_heartbeat, name='lesson-heartbeat'),
     path('lessons/<int:lesson_id>/materials/', views.LessonMaterialListCreateView.as_view(), name='lesson-materials'),
     
     # Teacher specific
@@ -25,6 +35,7 @@ urlpatterns = [
     
     # Reviews
     path('courses/<int:course_id>/reviews/', views.CourseReviewListCreateView.as_view(), name='course-reviews'),
+    path('reviews/<int:pk>/', views.CourseReviewDetailView.as_view(), name='review-detail'),
     
     # Course Progress
     path('courses/<int:course_id>/progress/', views.get_course_progress, name='course-progress'),
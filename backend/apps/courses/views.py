@@ -1,31 +1,109 @@
-from rest_framework import generics, status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework import filters, generics, serializers, status, permissions
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from django_filters.utils import translate_validation
+from django.core.cache import cache
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q, prefetch_related_objects
 from django.utils import timezone
+from .cache import (
+    CATALOG_CACHE_NAMESPACE, LESSON_CONTENT_TIMEOUT, get_catalog_cache_key, get_course_card_keys,
+    get_course_modified, get_course_version, get_lesson_content_key, get_lesson_course_id,
+    get_lesson_modified, get_lesson_slots, get_lesson_version, get_progress_namespace, invalidate_catalog
+)
+from .documents import absolutize_media_urls, get_course_document, invalidate_course_documents
+from .enrollments import AlreadyEnrolled, CourseFull, cancel_enrollment, enroll_student, enroll_students
+from .facets import FACETS, compute_facets
+from .heartbeats import record_heartbeat
+from .lessons import LessonOrderConflict, lock_course_lessons, move_lesson, save_lessons
+from .membership import ACTIVE_OR_COMPLETED, is_enrolled
+from .filters import CourseFilter, CourseSearchFilter, get_model_choice_params
+from .progress import get_completed_slots, record_completions
+from .trending import record_event
+from .typeahead import typeahead_index
 from .models import Category, Course, Lesson, Enrollment, LessonProgress, CourseReview, LessonMaterial
+from apps.core.identity import get_instance_or_404, remember, resolve_related
+from apps.core.cache import (
+    AnonymousResponseCacheMixin, ConditionalGetMixin, build_compressed_response, bump_cache_version,
+    compress_entry, get_cache_version
+)
+from apps.core.mixins import QueryBudgetMixin
+from apps.core.pagination import KeysetPagination
 from .serializers import (
     CategorySerializer, CourseSerializer, CourseCreateSerializer,
-    CourseDetailSerializer, LessonSerializer, EnrollmentSerializer,
-    LessonProgressSerializer, CourseReviewSerializer, LessonMaterialSerializer
+    CourseCardSerializer, CourseDetailSerializer, LessonSerializer, EnrollmentSerializer,
+    LessonHeartbeatSerializer, LessonProgressSerializer, LessonProgressSyncSerializer, CourseReviewSerializer, LessonMaterialSerializer,
+    LessonBatchSerializer, LessonMoveSerializer, RosterEnrollmentSerializer,
+    preload_enrollment_statuses
 )
 
-class CategoryListView(generics.ListCreateAPIView):
+class CategoryListView(AnonymousResponseCacheMixin, QueryBudgetMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    response_cache_namespace = CATALOG_CACHE_NAMESPACE
+    categories_cache_timeout = 60 * 5
+    # user, page count, categories with counts
+    query_budget = {'GET': 3}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            queryset = queryset.with_course_counts().order_by('id')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        # Shared by every user; pagination links embed the host. Keyed on
+        # every parameter, an empty ?fields= still trims the rows
+        cache_key = get_catalog_cache_key(f'categories:{request.get_host()}', request.query_params)
+        data = cache.get(cache_key)
+        if data is None:
+            data = super().list(request, *args, **kwargs).data
+            cache.set(cache_key, data, self.categories_cache_timeout)
+        return Response(data)
 
-class CourseListCreateView(generics.ListCreateAPIView):
-    queryset = Course.objects.filter(status='published')
+class CourseListCreateView(AnonymousResponseCacheMixin, QueryBudgetMixin, generics.ListCreateAPIView):
+    queryset = Course.objects.published()
     serializer_class = CourseSerializer
-    filter_backends = [DjangoFilterBackend]
-    filterset_fields = ['category', 'difficulty_level', 'teacher']
-    search_fields = ['title', 'description', 'teacher__first_name', 'teacher__last_name']
-    ordering_fields = ['created_at', 'rating', 'current_students']
+    response_cache_namespace = CATALOG_CACHE_NAMESPACE
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-created_at', '-id']
+    estimate_count = True
+    # user, count estimate, courses, lessons, materials, enrollments
+    query_budget = {'GET': 6}
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, CourseSearchFilter]
+    filterset_class = CourseFilter
+    ordering_fields = ['created_at', 'rating', 'current_students', 'trending_score']
     ordering = ['-created_at']
 
+    def get_query_budget(self, request):
+        budget = super().get_query_budget(request)
+        if budget is not None and request.GET.get(CourseSearchFilter.search_param):
+            # index lookup and highlighted snippets
+            budget += 2
+        if budget is not None:
+            # category and teacher lookups
+            budget += len(get_model_choice_params(request.GET))
+        return budget
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            relations = CourseSerializer.get_expanded_relations(self.request)
+            queryset = queryset.with_read_plan(relations)
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_terms'] = getattr(self, 'search_terms', None)
+        return context
+
     def get_serializer_class(self):
         if self.request.method == 'POST':
             return CourseCreateSerializer
@@ -42,9 +120,182 @@ class CourseListCreateView(generics.ListCreateAPIView):
             raise permissions.PermissionDenied("Only teachers can create courses")
         serializer.save()
 
-class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
+class CourseFacetsView(QueryBudgetMixin, generics.GenericAPIView):
+    """
+    Catalog facet counts (category, difficulty, price band, duration band)
+    under the same filters as the course list
+    """
+    queryset = Course.objects.published()
+    permission_classes = [permissions.AllowAny]
+    # user, filter validation, grouped counts
+    query_budget = {'GET': 3}
+    facets_cache_timeout = 60 * 5
+
+    def get_query_budget(self, request):
+        budget = super().get_query_budget(request)
+        if budget is not None and request.GET.get(CourseSearchFilter.search_param):
+            budget += 2
+        if budget is not None:
+            # Lookups validating category and teacher; filters that are not
+            # facets are validated again by the filterset the counts run under
+            lookups = get_model_choice_params(request.GET)
+            budget += len(lookups) + len([name for name in lookups if name not in FACETS])
+        return budget
+
+    def get(self, request, *args, **kwargs):
+        cache_key = get_catalog_cache_key('facets', request.query_params)
+        data = cache.get(cache_key)
+        if data is None:
+            filterset = CourseFilter(request.query_params, queryset=self.get_queryset(), request=request)
+            if not filterset.is_valid():
+                raise translate_validation(filterset.errors)
+
+            # Each facet ignores its own selection, so filter on the others only
+            params = request.query_params.copy()
+            selected = {}
+            for name in FACETS:
+                value = params.pop(name, [''])[-1]
+                if value:
+                    selected[name] = value
+            queryset = CourseFilter(params, queryset=self.get_queryset(), request=request).qs
+            queryset = CourseSearchFilter().filter_queryset(request, queryset, self)
+            data = compute_facets(queryset, selected)
+            cache.set(cache_key, data, self.facets_cache_timeout)
+        return Response(data)
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def course_autocomplete(request):
+    """
+    Search-as-you-type suggestions for course titles and teacher names,
+    answered from the in-process prefix index
+    """
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 8)), 20))
+    except ValueError:
+        limit = 8
+    return Response({'results': typeahead_index.suggest(request.query_params.get('q', ''), limit)})
+
+class RelatedCoursesView(QueryBudgetMixin, generics.ListAPIView):
+    """
+    "Students also took" courses, from the precomputed neighbours of a course
+    """
+    serializer_class = CourseSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    # user, neighbours, enrollment statuses
+    query_budget = {'GET': 3}
+
+    def get_sparse_options(self):
+        only, expand = CourseSerializer.get_sparse_options(self.request)
+        # Cards, so nested lessons only when asked for
+        return only, expand if expand is not None else {}
+
+    def get_queryset(self):
+        only, expand = self.get_sparse_options()
+        relations = CourseSerializer.get_expanded_relations(only=only, expand=expand)
+        return (
+            Course.objects.published()
+            .filter(recommended_for__course_id=self.kwargs['course_id'])
+            .order_by('recommended_for__rank')
+            .with_read_plan(relations)
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'], kwargs['expand'] = self.get_sparse_options()
+        return super().get_serializer(*args, **kwargs)
+
+class CourseBatchView(QueryBudgetMixin, generics.GenericAPIView):
+    """
+    Course cards for up to ``max_ids`` ids (``?ids=3,1,2``), in request order
+    """
+    queryset = Course.objects.select_related('teacher', 'category')
+    serializer_class = CourseCardSerializer
+    permission_classes = [permissions.AllowAny]
+    max_ids = 100
+    card_cache_timeout = 60 * 60
+    # user, cache misses, enrollment statuses
+    query_budget = {'GET': 3}
+
+    def get_ids(self):
+        # Ids past the primary key range would overflow the lookup
+        id_field = serializers.IntegerField(min_value=1, max_value=2 ** 63 - 1)
+        ids = []
+        for value in self.request.query_params.getlist('ids'):
+            for part in value.split(','):
+                if part.strip():
+                    ids.append(id_field.run_validation(part.strip()))
+        return list(dict.fromkeys(ids))
+
+    def get(self, request, *args, **kwargs):
+        try:
+            ids = self.get_ids()
+        except serializers.ValidationError:
+            return Response({'error': 'ids must be a comma separated list of positive integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > self.max_ids:
+            return Response({'error': f'At most {self.max_ids} ids per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        keys = get_course_card_keys(ids)
+        cached = cache.get_many(keys.values())
+        cards = {course_id: cached[key] for course_id, key in keys.items() if key in cached}
+        missing = [course_id for course_id in ids if course_id not in cards]
+        if missing:
+            # False remembers ids without a course until the catalog changes
+            fetched = dict.fromkeys(missing, False)
+            fetched.update(
+                (course.pk, self.get_serializer(course, context={}).data)
+                for course in self.get_queryset().filter(pk__in=missing)
+            )
+            cache.set_many({keys[course_id]: card for course_id, card in fetched.items()}, self.card_cache_timeout)
+            cards.update(fetched)
+
+        found = [course_id for course_id in ids if cards[course_id]]
+        statuses = preload_enrollment_statuses(self.get_serializer_context(), found)
+        results = [
+            dict(cards[course_id], is_enrolled=statuses.get(course_id) == 'active',
+                 enrollment_status=statuses.get(course_id))
+            for course_id in found
+        ]
+        return Response({'results': absolutize_media_urls(results, request)})
+
+class CourseDetailView(ConditionalGetMixin, QueryBudgetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.all()
     serializer_class = CourseDetailSerializer
+    # user and enrollment; a document rebuilt inline adds course, lessons, materials, reviews
+    query_budget = {'GET': 6}
+
+    def get_resource_version(self):
+        return get_course_version(self.kwargs['pk'])
+
+    def get_resource_modified(self):
+        return get_course_modified(self.kwargs['pk'])
+
+    def retrieve(self, request, *args, **kwargs):
+        # Sparse fieldsets are rendered from the database, full payloads from the document
+        if 'fields' in request.query_params or 'expand' in request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+
+        course_id = self.kwargs['pk']
+        document = get_course_document(course_id)
+        if document is None:
+            raise Http404
+        enrollment_status = preload_enrollment_statuses(
+            self.get_serializer_context(), [document['id']]
+        ).get(document['id'])
+        data = dict(
+            document,
+            is_enrolled=enrollment_status == 'active',
+            enrollment_status=enrollment_status,
+        )
+        return Response(absolutize_media_urls(data, request))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method == 'GET':
+            relations = CourseDetailSerializer.get_expanded_relations(self.request)
+            queryset = queryset.with_read_plan(relations).with_enrollment_count()
+        return queryset
 
     def get_permissions(self):
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
@@ -55,23 +306,39 @@ class CourseDetailView(generics.RetrieveUpdateDestroyAPIView):
         obj = super().get_object()
         # Only course teacher can modify/delete
         if self.request.method in ['PUT', 'PATCH', 'DELETE']:
+            # The teacher is the authenticated user, already in the identity map
+            resolve_related(obj, 'teacher')
             if obj.teacher != self.request.user:
-                raise permissions.PermissionDenied("You can only modify your own courses")
+                raise PermissionDenied("You can only modify your own courses")
         return obj
 
-class TeacherCoursesView(generics.ListAPIView):
+class TeacherCoursesView(QueryBudgetMixin, generics.ListAPIView):
     serializer_class = CourseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'GET': 6}
 
     def get_queryset(self):
-        return Course.objects.filter(teacher=self.request.user)
+        relations = CourseSerializer.get_expanded_relations(self.request)
+        return Course.objects.filter(teacher=self.request.user).with_read_plan(relations)
 
-class StudentCoursesView(generics.ListAPIView):
+class StudentCoursesView(QueryBudgetMixin, generics.ListAPIView):
     serializer_class = EnrollmentSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # user, count, enrollments, lessons, materials
+    query_budget = {'GET': 5}
 
     def get_queryset(self):
-        return Enrollment.objects.filter(student=self.request.user, status='active')
+        queryset = Enrollment.objects.filter(student=self.request.user, status='active')
+        relations = EnrollmentSerializer.get_expanded_relations(self.request)
+        if 'student' in relations:
+            queryset = queryset.select_related('student')
+        if 'course' in relations:
+            queryset = queryset.select_related('course__teacher', 'course__category')
+        if 'course.lessons.materials' in relations:
+            queryset = queryset.prefetch_related('course__lessons__materials')
+        elif 'course.lessons' in relations:
+            queryset = queryset.prefetch_related('course__lessons')
+        return queryset
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -85,101 +352,255 @@ def enroll_course(request, course_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Check if already enrolled
-    if Enrollment.objects.filter(student=request.user, course=course).exists():
+    # Takes a seat atomically, the unique constraint rejects duplicates
+    try:
+        enrollment = enroll_student(course, request.user)
+    except AlreadyEnrolled:
         return Response(
             {'error': 'Already enrolled in this course'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
-    
-    # Check course capacity
-    if course.current_students >= course.max_students:
+    except CourseFull:
         return Response(
             {'error': 'Course is full'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    # Create enrollment
-    enrollment = Enrollment.objects.create(student=request.user, course=course)
-    course.update_student_count()
-    
     return Response(
         EnrollmentSerializer(enrollment).data, 
         status=status.HTTP_201_CREATED
     )
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def enroll_roster(request, course_id):
+    """
+    Enroll a list of students (ids or emails) in one go, reporting the
+    outcome for each entry
+    """
+    course = get_object_or_404(Course, id=course_id, status='published')
+    if course.teacher_id != request.user.pk:
+        return Response(
+            {'error': 'Only the course teacher can enroll students'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    serializer = RosterEnrollmentSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    entries = [entry.strip() for entry in serializer.validated_data['students']]
+
+    # Resolve every entry with one query
+    ids = {int(entry) for entry in entries if entry.isdigit()}
+    emails = {entry for entry in entries if not entry.isdigit()}
+    students = get_user_model().objects.filter(
+        Q(pk__in=ids) | Q(email__in=emails), user_type='student'
+    ).only('id', 'email')
+    by_id = {student.pk: student for student in students}
+    by_email = {student.email: student for student in by_id.values()}
+    resolved = [by_id.get(int(entry)) if entry.isdigit() else by_email.get(entry) for entry in entries]
+
+    try:
+        admitted, existing = enroll_students(
+            course, list({student.pk: student for student in resolved if student}.values())
+        )
+    except IntegrityError:
+        return Response(
+            {'error': 'Some of these students enrolled meanwhile, please retry'}, 
+            status=status.HTTP_409_CONFLICT
+        )
+
+    results = []
+    for entry, student in zip(entries, resolved):
+        if student is None:
+            outcome = 'not_found'
+        elif student.pk in admitted:
+            outcome = 'enrolled'
+        elif student.pk in existing:
+            outcome = 'already_enrolled'
+        else:
+            outcome = 'course_full'
+        results.append({'student': entry, 'student_id': student and student.pk, 'status': outcome})
+    return Response({'enrolled': len(admitted), 'results': results})
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def unenroll_course(request, course_id):
-    enrollment = get_object_or_404(
-        Enrollment, 
-        student=request.user, 
-        course_id=course_id, 
-        status='active'
-    )
-    
-    enrollment.status = 'cancelled'
-    enrollment.save()
-    enrollment.course.update_student_count()
+    with transaction.atomic():
+        enrollment = get_object_or_404(
+            Enrollment.objects.select_for_update(), 
+            student=request.user, 
+            course_id=course_id, 
+            status='active'
+        )
+        cancel_enrollment(enrollment)
     
     return Response({'message': 'Successfully unenrolled from course'})
 
-class LessonListCreateView(generics.ListCreateAPIView):
+class LessonListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = LessonSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    def get_resource_version(self):
         course_id = self.kwargs['course_id']
-        course = get_object_or_404(Course, id=course_id)
+        # Students' lists carry their completion checkmarks
+        progress_version = get_cache_version(get_progress_namespace(course_id, self.request.user.pk))
+        return f'{get_course_version(course_id)}.{progress_version}'
+
+    def get_resource_modified(self):
+        return get_course_modified(self.kwargs['course_id'])
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, 'completed_slots', None) is not None:
+            context['completed_slots'] = self.completed_slots
+        return context
+
+    def get_queryset(self):
+        course = get_instance_or_404(Course, self.kwargs['course_id'])
         
         # Teachers can see all lessons, students only published ones
-        if self.request.user == course.teacher:
-            return course.lessons.all()
+        if self.request.user.pk == course.teacher_id:
+            lessons = course.lessons.all()
         else:
-            # Check if student is enrolled
-            if not Enrollment.objects.filter(
-                student=self.request.user, 
-                course=course, 
-                status='active'
-            ).exists():
+            if not is_enrolled(self.request.user.pk, course.pk):
                 return Lesson.objects.none()
-            return course.lessons.filter(is_published=True)
+            bitmap = Enrollment.objects.filter(
+                student=self.request.user, course=course
+            ).values_list('completion_bitmap', flat=True).first()
+            self.completed_slots = set(get_completed_slots(bitmap))
+            lessons = course.lessons.filter(is_published=True)
+
+        lessons = lessons.defer(*Lesson.OUTLINE_DEFERRED_FIELDS)
+        if 'materials' in LessonSerializer.get_expanded_relations(self.request):
+            lessons = lessons.prefetch_related('materials')
+        return lessons
 
     def perform_create(self, serializer):
-        course_id = self.kwargs['course_id']
-        course = get_object_or_404(Course, id=course_id)
+        course = get_instance_or_404(Course, self.kwargs['course_id'])
         
         # Only course teacher can add lessons
-        if course.teacher != self.request.user:
-            raise permissions.PermissionDenied("You can only add lessons to your own courses")
+        if course.teacher_id != self.request.user.pk:
+            raise PermissionDenied("You can only add lessons to your own courses")
         
         lesson = serializer.save(course=course)
         
         # Handle material uploads
+        materials = []
         materials_count = int(self.request.data.get('materials_count', 0))
         for i in range(materials_count):
             material_file = self.request.FILES.get(f'material_{i}')
             material_title = self.request.data.get(f'material_{i}_title', '')
             
             if material_file:
-                LessonMaterial.objects.create(
+                material = LessonMaterial(
                     lesson=lesson,
                     title=material_title or material_file.name,
                     file=material_file
                 )
+                material.set_file_details()
+                materials.append(material)
+        if materials:
+            LessonMaterial.objects.bulk_create(materials)
+            # bulk_create sends no post_save, do what the material receivers would
+            invalidate_course_documents([course.pk])
+            invalidate_catalog()
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def save_lesson_batch(request, course_id):
+    """
+    Create and update many lessons of a course at once, e.g. a whole
+    outline. Entries with an ``id`` update that lesson (only the fields
+    given), the others create one. Nothing is saved unless every entry is
+    valid.
+    """
+    course = get_instance_or_404(Course, course_id)
+    if course.teacher_id != request.user.pk:
+        raise PermissionDenied("You can only add lessons to your own courses")
+    serializer = LessonBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    entries = serializer.validated_data['lessons']
+
+    with transaction.atomic():
+        lessons = lock_course_lessons(course)
+        updates, creates, errors, seen = [], [], [], set()
+        for entry in entries:
+            lesson_id = entry.get('id')
+            if lesson_id is not None and (
+                not isinstance(lesson_id, int) or lesson_id not in lessons or lesson_id in seen
+            ):
+                errors.append({'id': ['Not a lesson of this course, or given twice']})
+                continue
+            seen.add(lesson_id)
+            # Field validation only, ordering is checked for the batch as a whole
+            lesson_serializer = LessonSerializer(
+                lessons.get(lesson_id), data=entry, partial=lesson_id is not None
+            )
+            if not lesson_serializer.is_valid():
+                errors.append(lesson_serializer.errors)
+            elif lesson_id is None:
+                creates.append(lesson_serializer.validated_data)
+                errors.append({})
+            else:
+                updates.append((lessons[lesson_id], lesson_serializer.validated_data))
+                errors.append({})
+        if any(errors):
+            raise serializers.ValidationError({'lessons': errors})
+
+        try:
+            with transaction.atomic():
+                saved = save_lessons(course, lessons, updates, creates)
+        except LessonOrderConflict as conflict:
+            raise serializers.ValidationError(
+                {'order': [f'More than one lesson would have order {order}' for order in conflict.orders]}
+            )
+        except IntegrityError:
+            return Response(
+                {'error': 'The course outline changed meanwhile, please retry'}, 
+                status=status.HTTP_409_CONFLICT
+            )
+
+    if 'materials' in LessonSerializer.get_expanded_relations(request):
+        prefetch_related_objects(saved, 'materials')
+    return Response(
+        LessonSerializer(saved, many=True, context={'request': request}).data,
+        status=status.HTTP_201_CREATED if creates else status.HTTP_200_OK
+    )
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def reorder_lesson(request, pk):
+    """
+    Move a lesson right after another one of its course (first for null),
+    only the moved lesson is rewritten
+    """
+    lesson = get_instance_or_404(Lesson, pk, related=['course'])
+    if lesson.course.teacher_id != request.user.pk:
+        raise PermissionDenied("You can only reorder your own lessons")
+    serializer = LessonMoveSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+
+    after = None
+    after_id = serializer.validated_data['after']
+    if after_id is not None:
+        after = Lesson.objects.filter(pk=after_id, course_id=lesson.course_id).exclude(pk=lesson.pk).first()
+        if after is None:
+            raise serializers.ValidationError({'after': ['Not another lesson of this course']})
+    move_lesson(lesson, after)
+    return Response(LessonSerializer(lesson, context={'request': request}).data)
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def mark_lesson_complete(request, pk):
-    lesson = get_object_or_404(Lesson, id=pk)
+    lesson = get_instance_or_404(Lesson, pk)
     
     # Check if student is enrolled in the course
     enrollment = get_object_or_404(
         Enrollment, 
         student=request.user, 
-        course=lesson.course, 
+        course_id=lesson.course_id, 
         status='active'
     )
+    remember(enrollment)
     
     # Get or create lesson progress
     lesson_progress, created = LessonProgress.objects.get_or_create(
@@ -189,38 +610,149 @@ def mark_lesson_complete(request, pk):
     )
     
     if not created and not lesson_progress.completed:
+        # The completion receivers read both
+        resolve_related(lesson_progress, 'enrollment', 'lesson')
         lesson_progress.completed = True
         lesson_progress.completed_at = timezone.now()
+        # Progress counters follow in the LessonProgress post_save
         lesson_progress.save()
-        
-        # Update enrollment progress
-        enrollment.update_progress()
     
     return Response({'message': 'Lesson marked as complete'}, status=status.HTTP_200_OK)
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def sync_lesson_progress(request):
+    """
+    Record a batch of lesson completions, e.g. made offline. Entries are
+    idempotent: replaying them keeps the earliest completion time and the
+    largest time spent.
+    """
+    serializer = LessonProgressSyncSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    entries = {}
+    for entry in serializer.validated_data['completions']:
+        completed_at = entry.get('completed_at') or timezone.now()
+        previous = entries.get(entry['lesson_id'])
+        if previous:
+            completed_at = min(completed_at, previous[0])
+            entry['time_spent'] = max(entry['time_spent'], previous[1])
+        entries[entry['lesson_id']] = (completed_at, entry['time_spent'])
+
+    # Lessons of the student's active enrollments, with the enrollment, in one query
+    lessons = {
+        lesson_id: (enrollment_id, course_id, slot)
+        for lesson_id, enrollment_id, course_id, slot in Lesson.objects.filter(
+            pk__in=entries,
+            course__enrollments__student=request.user,
+            course__enrollments__status='active'
+        ).values_list('id', 'course__enrollments__id', 'course_id', 'slot')
+    }
+
+    with transaction.atomic():
+        existing = {
+            (progress.enrollment_id, progress.lesson_id): progress
+            for progress in LessonProgress.objects.filter(
+                enrollment_id__in={enrollment_id for enrollment_id, _, _ in lessons.values()},
+                lesson_id__in=lessons
+            )
+        }
+        created, updated, results = [], [], []
+        slots = {}
+        for lesson_id, (completed_at, time_spent) in entries.items():
+            if lesson_id not in lessons:
+                results.append({'lesson_id': lesson_id, 'status': 'not_enrolled'})
+                continue
+            enrollment_id, course_id, slot = lessons[lesson_id]
+            progress = existing.get((enrollment_id, lesson_id))
+            was_completed = progress is not None and progress.completed
+            if progress is None:
+                created.append(LessonProgress(
+                    enrollment_id=enrollment_id, lesson_id=lesson_id, completed=True,
+                    completed_at=completed_at, time_spent_minutes=time_spent,
+                    time_spent_seconds=time_spent * 60
+                ))
+            elif not progress.completed or time_spent > progress.time_spent_minutes:
+                if not progress.completed:
+                    progress.completed_at = completed_at
+                progress.completed = True
+                progress.time_spent_seconds = max(progress.time_spent_seconds, time_spent * 60)
+                progress.time_spent_minutes = progress.time_spent_seconds // 60
+                updated.append(progress)
+            results.append({'lesson_id': lesson_id, 'status': 'already_completed' if was_completed else 'completed'})
+            slots.setdefault((enrollment_id, course_id), []).append(slot)
+
+        # Concurrent completions of the same lesson are already in the bitmaps
+        LessonProgress.objects.bulk_create(created, ignore_conflicts=True)
+        LessonProgress.objects.bulk_update(
+            updated, ['completed', 'completed_at', 'time_spent_minutes', 'time_spent_seconds']
+        )
+
+        # Bulk writes send no signals, update each enrollment's progress once
+        for (enrollment_id, course_id), enrollment_slots in slots.items():
+            newly_completed = record_completions(enrollment_id, enrollment_slots)
+            if newly_completed:
+                record_event(course_id, 'completion', count=newly_completed)
+                namespace = get_progress_namespace(course_id, request.user.pk)
+                transaction.on_commit(lambda namespace=namespace: bump_cache_version(namespace))
+
+    progress = Enrollment.objects.filter(
+        pk__in={enrollment_id for enrollment_id, _ in slots}
+    ).values('course_id', 'completed_count', 'progress_percentage')
+    return Response({'results': results, 'progress': list(progress)})
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def lesson_heartbeat(request, pk):
+    """
+    Periodic report from a lesson player or reader. Buffered in the cache
+    and written to the student's progress in batches.
+    """
+    course_id = get_lesson_course_id(pk)
+    if course_id is None:
+        raise Http404
+    if not is_enrolled(request.user.pk, course_id):
+        raise PermissionDenied("You must be enrolled in the course")
+    serializer = LessonHeartbeatSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    record_heartbeat(
+        request.user.pk, pk,
+        serializer.validated_data['elapsed_seconds'],
+        serializer.validated_data.get('position_seconds')
+    )
+    return Response(status=status.HTTP_202_ACCEPTED)
+
 class CourseReviewListCreateView(generics.ListCreateAPIView):
     serializer_class = CourseReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+    keyset_ordering = ['-created_at', '-id']
 
     def get_queryset(self):
         course_id = self.kwargs['course_id']
-        return CourseReview.objects.filter(course_id=course_id)
+        return CourseReview.objects.filter(course_id=course_id).select_related('student')
 
     def perform_create(self, serializer):
-        course_id = self.kwargs['course_id']
-        course = get_object_or_404(Course, id=course_id)
+        course = get_instance_or_404(Course, self.kwargs['course_id'])
         
-        # Check if student is enrolled
-        if not Enrollment.objects.filter(
-            student=self.request.user, 
-            course=course, 
-            status__in=['active', 'completed']
-        ).exists():
-            raise permissions.PermissionDenied("You must be enrolled (active or completed) to review this course")
+        if not is_enrolled(self.request.user.pk, course.pk, ACTIVE_OR_COMPLETED):
+            raise PermissionDenied("You must be enrolled (active or completed) to review this course")
         
-        review = serializer.save(student=self.request.user, course=course)
-        # Update course rating
-        course.update_rating()
+        if CourseReview.objects.filter(student=self.request.user, course=course).exists():
+            raise serializers.ValidationError({'error': 'You have already reviewed this course'})
+
+        # The course rating aggregates are updated by the review signals
+        serializer.save(student=self.request.user, course=course)
+
+class CourseReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
+    queryset = CourseReview.objects.select_related('student')
+    serializer_class = CourseReviewSerializer
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+
+    def get_object(self):
+        review = super().get_object()
+        if self.request.method not in permissions.SAFE_METHODS and review.student_id != self.request.user.pk:
+            raise PermissionDenied("You can only modify your own reviews")
+        return review
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -228,103 +760,141 @@ def get_course_progress(request, course_id):
     """
     Get the progress of a student in a course
     """
-    course = get_object_or_404(Course, id=course_id)
     enrollment = get_object_or_404(
-        Enrollment, 
+        Enrollment.objects.select_related('course'), 
         student=request.user,
-        course=course,
+        course_id=course_id,
         status__in=['active', 'completed']
     )
     
-    # Get completed lessons
-    completed_lesson_progress = LessonProgress.objects.filter(
-        enrollment=enrollment,
-        completed=True
-    )
-    completed_lessons_count = completed_lesson_progress.count()
-    completed_lesson_ids = list(completed_lesson_progress.values_list('lesson_id', flat=True))
-    
-    # Get total lessons
-    total_lessons = course.lessons.filter(is_published=True).count()
-    
-    # Calculate progress percentage
-    progress_percentage = (completed_lessons_count / total_lessons * 100) if total_lessons > 0 else 0
+    # Counts, percentage and completed lessons are kept current by apps.courses.progress
+    slots = get_lesson_slots(course_id)
+    completed_lesson_ids = [
+        slots[slot] for slot in get_completed_slots(enrollment.completion_bitmap) if slot in slots
+    ]
+    progress_percentage = float(enrollment.progress_percentage)
     
     return Response({
-        'total_lessons': total_lessons,
-        'completed_lessons': completed_lessons_count,
+        'total_lessons': enrollment.course.published_lesson_count,
+        'completed_lessons': enrollment.completed_count,
         'completed_lesson_ids': completed_lesson_ids,
         'progress_percentage': round(progress_percentage, 2),
         'progress': round(progress_percentage, 2)  # Alias for frontend compatibility
     })
 
-class LessonDetailView(generics.RetrieveUpdateDestroyAPIView):
+def check_lesson_access(user, lesson):
+    # Teachers can access any lesson they created
+    if user.pk == lesson.course.teacher_id:
+        return
+
+    # Students can only access published lessons from enrolled courses
+    if user.user_type == 'student':
+        if not is_enrolled(user.pk, lesson.course_id):
+            raise Http404
+        if lesson.is_published:
+            return
+        raise PermissionDenied("This lesson is not published")
+
+    raise PermissionDenied("You don't have permission to access this lesson")
+
+class LessonDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_resource_version(self):
+        course_id = get_lesson_course_id(self.kwargs['pk'])
+        return get_course_version(course_id) if course_id else None
+
+    def get_resource_modified(self):
+        return get_course_modified(get_lesson_course_id(self.kwargs['pk']))
+
     def get_object(self):
-        obj = super().get_object()
-        user = self.request.user
-
-        # Teachers can access any lesson they created
-        if user == obj.course.teacher:
-            return obj
-
-        # Students can only access published lessons from enrolled courses
-        if user.user_type == 'student':
-            enrollment = get_object_or_404(
-                Enrollment,
-                student=user,
-                course=obj.course,
-                status='active'
-            )
-            if obj.is_published:
-                return obj
-            raise permissions.PermissionDenied("This lesson is not published")
-        
-        raise permissions.PermissionDenied("You don't have permission to access this lesson")
+        # Called again by perform_update and perform_destroy, the identity map
+        # keeps that from reloading the lesson and its course
+        obj = get_instance_or_404(Lesson, self.kwargs['pk'], related=['course'])
+        self.check_object_permissions(self.request, obj)
+        check_lesson_access(self.request.user, obj)
+        return obj
 
     def perform_update(self, serializer):
         lesson = self.get_object()
         # Only course teacher can update lessons
-        if lesson.course.teacher != self.request.user:
-            raise permissions.PermissionDenied("You can only update your own lessons")
+        if lesson.course.teacher_id != self.request.user.pk:
+            raise PermissionDenied("You can only update your own lessons")
         serializer.save()
 
     def perform_destroy(self, instance):
         # Only course teacher can delete lessons
-        if instance.course.teacher != self.request.user:
-            raise permissions.PermissionDenied("You can only delete your own lessons")
+        if instance.course.teacher_id != self.request.user.pk:
+            raise PermissionDenied("You can only delete your own lessons")
         instance.delete()
 
-class LessonMaterialListCreateView(generics.ListCreateAPIView):
+class LessonContentView(ConditionalGetMixin, generics.RetrieveAPIView):
+    """
+    Full content of a lesson, which lesson lists and course outlines leave
+    out. The rendered body is cached gzip-compressed under the lesson
+    version, which only moves when the content may have changed, and sent
+    as is to clients accepting gzip.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_resource_version(self):
+        # Lessons that never existed get no version key
+        if get_lesson_course_id(self.kwargs['pk']) is None:
+            return None
+        return get_lesson_version(self.kwargs['pk'])
+
+    def get_resource_modified(self):
+        return get_lesson_modified(self.kwargs['pk'])
+
+    def get_object(self):
+        # The content itself is only loaded to render a missing entry
+        obj = get_object_or_404(
+            Lesson.objects.select_related('course').defer(*Lesson.OUTLINE_DEFERRED_FIELDS),
+            pk=self.kwargs['pk']
+        )
+        self.check_object_permissions(self.request, obj)
+        check_lesson_access(self.request.user, obj)
+        return obj
+
+    def retrieve(self, request, *args, **kwargs):
+        lesson = self.get_object()
+        key = get_lesson_content_key(lesson.pk)
+        entry = cache.get(key)
+        if entry is None:
+            body = JSONRenderer().render({'id': lesson.pk, 'content': lesson.content})
+            entry = compress_entry(body, 'application/json')
+            cache.set(key, entry, LESSON_CONTENT_TIMEOUT)
+        return build_compressed_response(request, entry)
+
+class LessonMaterialListCreateView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = LessonMaterialSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_resource_version(self):
+        course_id = get_lesson_course_id(self.kwargs['lesson_id'])
+        return get_course_version(course_id) if course_id else None
+
+    def get_resource_modified(self):
+        return get_course_modified(get_lesson_course_id(self.kwargs['lesson_id']))
+
     def get_queryset(self):
-        lesson_id = self.kwargs['lesson_id']
-        lesson = get_object_or_404(Lesson, id=lesson_id)
+        lesson = get_instance_or_404(Lesson, self.kwargs['lesson_id'], related=['course'])
         
         # Teachers can see all materials, students only if enrolled
-        if self.request.user == lesson.course.teacher:
+        if self.request.user.pk == lesson.course.teacher_id:
             return lesson.materials.all()
         else:
-            # Check if student is enrolled
-            if not Enrollment.objects.filter(
-                student=self.request.user, 
-                course=lesson.course, 
-                status='active'
-            ).exists():
+            if not is_enrolled(self.request.user.pk, lesson.course_id):
                 return LessonMaterial.objects.none()
             return lesson.materials.all()
 
     def perform_create(self, serializer):
-        lesson_id = self.kwargs['lesson_id']
-        lesson = get_object_or_404(Lesson, id=lesson_id)
+        lesson = get_instance_or_404(Lesson, self.kwargs['lesson_id'], related=['course'])
         
         # Only course teacher can add materials
-        if lesson.course.teacher != self.request.user:
-            raise permissions.PermissionDenied("You can only add materials to your own lessons")
+        if lesson.course.teacher_id != self.request.user.pk:
+            raise PermissionDenied("You can only add materials to your own lessons")
         
         serializer.save(lesson=lesson)
\ No newline at end of file
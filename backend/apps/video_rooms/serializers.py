@@ -2,8 +2,9 @@ from rest_framework import serializers
 from .models import VideoRoom, RoomParticipant, AgoraToken
 from apps.authentication.serializers import UserProfileSerializer
 from apps.courses.serializers import CourseSerializer, LessonSerializer
+from apps.core.serializers import SparseFieldsetMixin
 
-class RoomParticipantSerializer(serializers.ModelSerializer):
+class RoomParticipantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserProfileSerializer(read_only=True)
 
     class Meta:
@@ -12,8 +13,9 @@ class RoomParticipantSerializer(serializers.ModelSerializer):
             'id', 'user', 'role', 'joined_at', 'left_at',
             'is_video_on', 'is_audio_on', 'is_screen_sharing'
         ]
+        expandable_fields = ['user']
 
-class VideoRoomSerializer(serializers.ModelSerializer):
+class VideoRoomSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     host = UserProfileSerializer(read_only=True)
     course = CourseSerializer(read_only=True)
     lesson = LessonSerializer(read_only=True)
@@ -27,6 +29,7 @@ class VideoRoomSerializer(serializers.ModelSerializer):
             'is_active', 'max_participants', 'current_participants_count',
             'participants', 'created_at', 'started_at', 'ended_at'
         ]
+        expandable_fields = ['host', 'course', 'lesson', 'participants']
 
 class VideoRoomCreateSerializer(serializers.ModelSerializer):
     class Meta:
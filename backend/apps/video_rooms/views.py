@@ -4,6 +4,11 @@ from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.conf import settings
+from django.db.models import Prefetch
+from rest_framework.exceptions import PermissionDenied
+from apps.core.identity import get_instance_or_404
+from apps.courses.membership import get_active_course_ids, is_enrolled
+from apps.courses.models import Lesson
 from .models import VideoRoom, RoomParticipant, AgoraToken
 from .serializers import (
     VideoRoomSerializer, VideoRoomCreateSerializer, 
@@ -12,6 +17,33 @@ from .serializers import (
 from .utils import generate_agora_token
 import time
 
+def with_room_plan(queryset, request):
+    """Load only the relations VideoRoomSerializer will serialize for this request"""
+    relations = VideoRoomSerializer.get_expanded_relations(request)
+    if 'host' in relations:
+        queryset = queryset.select_related('host')
+    if 'course' in relations:
+        queryset = queryset.select_related('course__teacher', 'course__category')
+    # Nested lessons are outlines, their heavy columns are never serialized
+    deferred = Lesson.OUTLINE_DEFERRED_FIELDS
+    if 'course.lessons' in relations:
+        queryset = queryset.prefetch_related(
+            Prefetch('course__lessons', queryset=Lesson.objects.defer(*deferred))
+        )
+    if 'course.lessons.materials' in relations:
+        queryset = queryset.prefetch_related('course__lessons__materials')
+    if 'lesson' in relations:
+        queryset = queryset.select_related('lesson').defer(*[f'lesson__{name}' for name in deferred])
+    if 'lesson.materials' in relations:
+        queryset = queryset.prefetch_related('lesson__materials')
+    if 'participants.user' in relations:
+        queryset = queryset.prefetch_related(
+            Prefetch('participants', queryset=RoomParticipant.objects.select_related('user'))
+        )
+    elif 'participants' in relations:
+        queryset = queryset.prefetch_related('participants')
+    return queryset
+
 class VideoRoomListCreateView(generics.ListCreateAPIView):
     serializer_class = VideoRoomSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -19,15 +51,11 @@ class VideoRoomListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.user_type == 'teacher':
-            return VideoRoom.objects.filter(host=user)
+            rooms = VideoRoom.objects.filter(host=user)
         else:
             # Students can see rooms for courses they're enrolled in
-            from apps.courses.models import Enrollment
-            enrolled_courses = Enrollment.objects.filter(
-                student=user, 
-                status='active'
-            ).values_list('course_id', flat=True)
-            return VideoRoom.objects.filter(course_id__in=enrolled_courses)
+            rooms = VideoRoom.objects.filter(course_id__in=get_active_course_ids(user.pk))
+        return with_room_plan(rooms, self.request)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -45,40 +73,33 @@ class VideoRoomDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = VideoRoomSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_queryset(self):
+        return with_room_plan(super().get_queryset(), self.request)
+
     def get_object(self):
         obj = super().get_object()
         user = self.request.user
         
         # Check permissions
         if user.user_type == 'teacher':
-            if obj.host != user:
-                raise permissions.PermissionDenied("You can only access your own rooms")
+            if obj.host_id != user.pk:
+                raise PermissionDenied("You can only access your own rooms")
         else:
             # Check if student is enrolled in the course
-            from apps.courses.models import Enrollment
-            if not Enrollment.objects.filter(
-                student=user, 
-                course=obj.course, 
-                status='active'
-            ).exists():
-                raise permissions.PermissionDenied("You must be enrolled in the course")
+            if not is_enrolled(user.pk, obj.course_id):
+                raise PermissionDenied("You must be enrolled in the course")
         
         return obj
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def join_room(request, room_id):
-    room = get_object_or_404(VideoRoom, id=room_id)
+    room = get_instance_or_404(VideoRoom, room_id)
     user = request.user
     
     # Check if user can join the room
     if user.user_type == 'student':
-        from apps.courses.models import Enrollment
-        if not Enrollment.objects.filter(
-            student=user, 
-            course=room.course, 
-            status='active'
-        ).exists():
+        if not is_enrolled(user.pk, room.course_id):
             return Response(
                 {'error': 'You must be enrolled in the course to join this room'}, 
                 status=status.HTTP_403_FORBIDDEN
@@ -96,7 +117,7 @@ def join_room(request, room_id):
         room=room,
         user=user,
         defaults={
-            'role': 'host' if user == room.host else 'participant',
+            'role': 'host' if user.pk == room.host_id else 'participant',
             'left_at': None
         }
     )
@@ -108,7 +129,7 @@ def join_room(request, room_id):
         participant.save()
     
     # Activate room if host joins
-    if user == room.host and not room.is_active:
+    if user.pk == room.host_id and not room.is_active:
         room.is_active = True
         room.started_at = timezone.now()
         room.save()
@@ -118,7 +139,7 @@ def join_room(request, room_id):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def leave_room(request, room_id):
-    room = get_object_or_404(VideoRoom, id=room_id)
+    room = get_instance_or_404(VideoRoom, room_id)
     participant = get_object_or_404(
         RoomParticipant, 
         room=room, 
@@ -130,7 +151,7 @@ def leave_room(request, room_id):
     participant.save()
     
     # End room if host leaves
-    if request.user == room.host:
+    if request.user.pk == room.host_id:
         room.is_active = False
         room.ended_at = timezone.now()
         room.save()
@@ -155,22 +176,17 @@ def generate_token(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    room = get_object_or_404(VideoRoom, id=room_id)
+    room = get_instance_or_404(VideoRoom, room_id)
     user = request.user
     
     # Check if user can access the room
     if user.user_type == 'student':
-        from apps.courses.models import Enrollment
-        if not Enrollment.objects.filter(
-            student=user, 
-            course=room.course, 
-            status='active'
-        ).exists():
+        if not is_enrolled(user.pk, room.course_id):
             return Response(
                 {'error': 'Access denied'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-    elif user != room.host:
+    elif user.pk != room.host_id:
         return Response(
             {'error': 'Access denied'}, 
             status=status.HTTP_403_FORBIDDEN
@@ -213,7 +229,7 @@ def generate_token(request):
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def update_participant_status(request, room_id):
-    room = get_object_or_404(VideoRoom, id=room_id)
+    room = get_instance_or_404(VideoRoom, room_id)
     participant = get_object_or_404(
         RoomParticipant, 
         room=room, 
@@ -240,22 +256,17 @@ def update_participant_status(request, room_id):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def get_room_participants(request, room_id):
-    room = get_object_or_404(VideoRoom, id=room_id)
+    room = get_instance_or_404(VideoRoom, room_id)
     user = request.user
     
     # Check if user can access the room
     if user.user_type == 'student':
-        from apps.courses.models import Enrollment
-        if not Enrollment.objects.filter(
-            student=user, 
-            course=room.course, 
-            status='active'
-        ).exists():
+        if not is_enrolled(user.pk, room.course_id):
             return Response(
                 {'error': 'Access denied'}, 
                 status=status.HTTP_403_FORBIDDEN
             )
-    elif user != room.host:
+    elif user.pk != room.host_id:
         return Response(
             {'error': 'Access denied'}, 
             status=status.HTTP_403_FORBIDDEN
@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.identity.IdentityMapMiddleware',
 ]
 
 ROOT_URLCONF = 'elearning_platform.urls'
@@ -126,7 +127,7 @@ AUTH_USER_MODEL = 'authentication.User'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.authentication.authentication.IdentityMapJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -140,6 +141,9 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Views with a query_budget raise when they exceed it (log a warning otherwise)
+QUERY_BUDGET_STRICT = config('QUERY_BUDGET_STRICT', default=DEBUG, cast=bool)
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -169,6 +173,24 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache Configuration
+# Cached catalog responses are invalidated through a shared version counter,
+# so multi-process deployments should point REDIS_CACHE_URL at Redis.
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 # Email Configuration (for development)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
@@ -179,6 +201,18 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+# Run tasks inline when no worker is available (local development)
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_BEAT_SCHEDULE = {
+    'rebuild-course-recommendations': {
+        'task': 'apps.courses.tasks.rebuild_course_recommendations',
+        'schedule': 60 * 60 * 6,
+    },
+    'flush-lesson-heartbeats': {
+        'task': 'apps.courses.tasks.flush_lesson_heartbeats',
+        'schedule': 60,
+    },
+}
 
 # Logging Configuration
 LOGGING = {
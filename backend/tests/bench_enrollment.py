@@ -0,0 +1,108 @@
+"""
+Enrollment admission under a launch rush: many students enroll into a small
+course at the same moment, exactly ``max_students`` of them must get in and
+the course's seat count must match its active enrollments.
+
+Runs against a live server like the other API tests:
+
+    python bench_enrollment.py [students] [capacity] [workers]
+"""
+import sys
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from datetime import datetime
+from test_utils import TestLogger
+from test_enrollment import EnrollmentTest
+
+def register_student(base_url, email, password, username):
+    response = requests.post(f"{base_url}/auth/register/", json={
+        'email': email,
+        'username': username,
+        'password': password,
+        'confirm_password': password,
+        'user_type': 'student',
+        'first_name': 'Rush',
+        'last_name': 'Student',
+        'phone': '1234567890'
+    })
+    if response.status_code != 201:
+        TestLogger.error(f"Student registration failed: {response.text}")
+        return None
+    return response.json()['tokens']['access']
+
+def enroll(base_url, course_id, token):
+    started = time.perf_counter()
+    response = requests.post(
+        f"{base_url}/courses/courses/{course_id}/enroll/",
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    return response.status_code, time.perf_counter() - started
+
+def run_enrollment_benchmark(students=300, capacity=50, workers=64):
+    TestLogger.log("\n=== Running Enrollment Admission Benchmark ===")
+    tester = EnrollmentTest()
+    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+
+    teacher_email = f"rushteacher{timestamp}@example.com"
+    teacher_password = "TeacherPass123!"
+    if not tester.test_register(teacher_email, teacher_password, user_type="teacher",
+                                username=f"rushteacher{timestamp}"):
+        TestLogger.error("Teacher registration failed. Stopping benchmark.")
+        return
+    if not tester.test_login(teacher_email, teacher_password):
+        TestLogger.error("Teacher login failed. Stopping benchmark.")
+        return
+    category_id = tester.test_create_category(f"Rush Category {timestamp}", "Enrollment benchmark")
+    course_id = tester.test_create_course(
+        "Launch Rush Course", "Course for the enrollment benchmark", category_id,
+        max_students=capacity, status="published"
+    )
+    if not course_id:
+        TestLogger.error("Course creation failed. Stopping benchmark.")
+        return
+
+    TestLogger.log(f"Registering {students} students")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        tokens = list(executor.map(
+            lambda i: register_student(
+                tester.BASE_URL, f"rush{timestamp}_{i}@example.com", "StudentPass123!", f"rush{timestamp}_{i}"
+            ),
+            range(students)
+        ))
+    tokens = [token for token in tokens if token]
+
+    # Every student enrolls at once, some of them twice
+    requests_to_send = tokens + tokens[:students // 10]
+    TestLogger.log(f"Sending {len(requests_to_send)} enroll requests with {workers} workers")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda token: enroll(tester.BASE_URL, course_id, token), requests_to_send))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(code for code, _ in results)
+    latencies = sorted(duration for _, duration in results)
+    TestLogger.log(f"Status codes: {dict(statuses)}")
+    TestLogger.log(
+        f"{len(results) / elapsed:.0f} requests/s, "
+        f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.0f} ms"
+    )
+
+    course = requests.get(f"{tester.BASE_URL}/courses/courses/{course_id}/", headers=tester.get_headers()).json()
+    admitted = statuses[201]
+    if admitted == min(capacity, len(tokens)) == course.get('current_students'):
+        TestLogger.success(f"Admitted exactly {admitted} of {len(tokens)} students, seat count {course['current_students']}")
+    else:
+        TestLogger.error(
+            f"Admitted {admitted} students for {capacity} seats, seat count {course.get('current_students')}"
+        )
+    if statuses.keys() - {201, 400}:
+        TestLogger.error("Unexpected status codes during the rush")
+
+    if tester.test_delete_course(course_id):
+        TestLogger.success("Benchmark course cleanup successful")
+
+if __name__ == '__main__':
+    run_enrollment_benchmark(*[int(arg) for arg in sys.argv[1:4]])
@@ -0,0 +1,120 @@
+"""
+Completed-lesson lookups from LessonProgress rows versus the enrollment's
+completion bitmap, for courses with 200 lessons.
+
+Runs against the configured database inside a transaction that is rolled
+back at the end:
+
+    python bench_progress.py [lessons] [students]
+"""
+import os
+import random
+import sys
+import time
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'elearning_platform.settings')
+django.setup()
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from apps.courses.models import Category, Course, Enrollment, Lesson, LessonProgress
+from apps.courses.progress import get_completed_slots, make_bitmap
+from test_utils import TestLogger
+
+def timed(label, repeat, fn):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    TestLogger.log(f"{label}: {elapsed * 1000:.2f} ms")
+    return result, elapsed
+
+def create_fixture(lesson_count, student_count):
+    User = get_user_model()
+    stamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
+    teacher = User.objects.create(username=f"benchteacher{stamp}", email=f"benchteacher{stamp}@example.com", user_type='teacher')
+    category = Category.objects.create(name=f"Bench {stamp}")
+    course = Course.objects.create(
+        title="Progress benchmark", description="Benchmark course", teacher=teacher, category=category,
+        difficulty_level='beginner', duration_weeks=8, max_students=student_count, price=0, status='published'
+    )
+    lessons = Lesson.objects.bulk_create([
+        Lesson(course=course, title=f"Lesson {slot}", description="", lesson_type='reading', order=slot,
+               duration_minutes=10, is_published=True, slot=slot)
+        for slot in range(lesson_count)
+    ])
+    students = User.objects.bulk_create([
+        User(username=f"benchstudent{stamp}_{i}", email=f"benchstudent{stamp}_{i}@example.com", user_type='student')
+        for i in range(student_count)
+    ])
+    enrollments = Enrollment.objects.bulk_create([Enrollment(student=student, course=course) for student in students])
+
+    progress = []
+    for enrollment in enrollments:
+        done = random.sample(lessons, random.randint(0, lesson_count))
+        enrollment.completion_bitmap = make_bitmap(lesson.slot for lesson in done)
+        enrollment.completed_count = len(done)
+        progress += [
+            LessonProgress(enrollment=enrollment, lesson=lesson, completed=True, completed_at=timezone.now())
+            for lesson in done
+        ]
+    Enrollment.objects.bulk_update(enrollments, ['completion_bitmap', 'completed_count'], batch_size=500)
+    LessonProgress.objects.bulk_create(progress, batch_size=2000)
+    return course, enrollments, len(progress)
+
+def run_progress_benchmark(lesson_count=200, student_count=200, repeat=20):
+    TestLogger.log("\n=== Running Progress Lookup Benchmark ===")
+    random.seed(42)
+    with transaction.atomic():
+        course, enrollments, row_count = create_fixture(lesson_count, student_count)
+        TestLogger.log(f"{lesson_count} lessons, {student_count} students, {row_count} completion rows")
+        slots = dict(Lesson.objects.filter(course=course).values_list('slot', 'id'))
+        enrollment = enrollments[len(enrollments) // 2]
+
+        # One student's outline
+        rows, row_time = timed("Rows, one student", repeat, lambda: set(
+            LessonProgress.objects.filter(enrollment=enrollment, completed=True).values_list('lesson_id', flat=True)
+        ))
+        bits, bit_time = timed("Bitmap, one student", repeat, lambda: {
+            slots[slot] for slot in get_completed_slots(
+                Enrollment.objects.filter(pk=enrollment.pk).values_list('completion_bitmap', flat=True).get()
+            )
+        })
+        if rows != bits:
+            TestLogger.error("Row and bitmap lookups disagree for one student")
+
+        # Every student's outline, e.g. a teacher's progress grid
+        def all_rows():
+            completed = {}
+            for enrollment_id, lesson_id in LessonProgress.objects.filter(
+                enrollment__course=course, completed=True
+            ).values_list('enrollment_id', 'lesson_id').iterator():
+                completed.setdefault(enrollment_id, set()).add(lesson_id)
+            return completed
+
+        def all_bitmaps():
+            return {
+                enrollment_id: {slots[slot] for slot in get_completed_slots(bitmap)}
+                for enrollment_id, bitmap in Enrollment.objects.filter(course=course).values_list(
+                    'id', 'completion_bitmap'
+                ).iterator()
+            }
+
+        grid_rows, grid_row_time = timed("Rows, every student", max(repeat // 4, 1), all_rows)
+        grid_bits, grid_bit_time = timed("Bitmap, every student", max(repeat // 4, 1), all_bitmaps)
+        if any(grid_rows.get(enrollment_id, set()) != lessons for enrollment_id, lessons in grid_bits.items()):
+            TestLogger.error("Row and bitmap lookups disagree for the progress grid")
+
+        TestLogger.success(
+            f"Bitmap is {row_time / bit_time:.1f}x faster for one student, "
+            f"{grid_row_time / grid_bit_time:.1f}x for every student "
+            f"({(lesson_count + 7) // 8} bytes per enrollment instead of up to {lesson_count} rows)"
+        )
+        transaction.set_rollback(True)
+
+if __name__ == '__main__':
+    run_progress_benchmark(*[int(arg) for arg in sys.argv[1:3]])
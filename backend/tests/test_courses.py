@@ -155,6 +155,19 @@ def run_course_tests():
         if categories:
             TestLogger.success(f"Found {len(categories.get('results', []))} categories")
         
+        # The category cache is shared by every user, an empty ?fields= and
+        # the plain listing must not be served from the same entry
+        url = f"{tester.BASE_URL}/courses/categories/"
+        trimmed = requests.get(url, params={'fields': ''}, headers=tester.get_headers()).json()
+        plain = requests.get(url, headers=tester.get_headers()).json()
+        if (
+            all(c == {} for c in trimmed.get('results', []))
+            and plain.get('results') and all('id' in c for c in plain['results'])
+        ):
+            TestLogger.success("Category ?fields= and the plain listing are cached separately")
+        else:
+            TestLogger.error("Category ?fields= and the plain listing shared a cache entry")
+        
         # Test course creation
         course_id = tester.test_create_course(
             "Python Programming Basics",
@@ -174,11 +187,76 @@ def run_course_tests():
             courses = tester.test_list_courses()
             if courses:
                 TestLogger.success(f"Found {len(courses.get('results', []))} courses")
+
+            # Test sparse fieldsets
+            sparse = tester.test_list_courses(fields='id,title', expand='')
+            if sparse and all(set(c) == {'id', 'title'} for c in sparse.get('results', [])):
+                TestLogger.success("Sparse course listing returned only the requested fields")
+            else:
+                TestLogger.error("Sparse course listing returned unexpected fields")
+            
+            # Anonymous responses are cached per query string, an empty
+            # ?expand= must not be served for the bare URL
+            url = f"{tester.BASE_URL}/courses/courses/"
+            anonymous = tester.get_headers(include_auth=False)
+            requests.get(url, params={'expand': ''}, headers=anonymous)
+            full = requests.get(url, headers=anonymous).json()
+            if all('lessons' in c for c in full.get('results', [])):
+                TestLogger.success("Anonymous ?expand= and the bare course list are cached separately")
+            else:
+                TestLogger.error("Anonymous course list was served from the ?expand= cache entry")
             
+            # Test ranked search (with a typo)
+            found = tester.test_list_courses(search='Pythn Basics')
+            if found and any(c['id'] == course_id for c in found.get('results', [])):
+                TestLogger.success("Course search found the new course")
+            else:
+                TestLogger.error("Course search did not find the new course")
+
+            # Test course card batches, malformed and out of range ids are rejected
+            url = f"{tester.BASE_URL}/courses/courses/batch/"
+            zero = requests.get(url, params={'ids': f'{course_id},0'})
+            bad = requests.get(url, params={'ids': f'{course_id},abc'})
+            overflow = requests.get(url, params={'ids': '99999999999999999999'})
+            if bad.status_code == 400 and zero.status_code == 400 and overflow.status_code == 400:
+                TestLogger.success("Course batch rejected bad and out of range ids")
+            else:
+                TestLogger.error(
+                    f"Course batch expected 400 for bad ids, got {bad.status_code}, {zero.status_code}, {overflow.status_code}"
+                )
+            cards = requests.get(url, params={'ids': str(course_id)})
+            if cards.status_code == 200 and [c['id'] for c in cards.json()['results']] == [course_id]:
+                TestLogger.success("Course batch returned the requested card")
+            else:
+                TestLogger.error(f"Course batch failed: {cards.text}")
+
             # Test course details
             details = tester.test_get_course_details(course_id)
             if details:
                 TestLogger.success("Successfully retrieved course details")
+
+                # Category and teacher filters each look their row up,
+                # combined with search they must stay within the query budget
+                filters = {'category': category_id, 'teacher': details['teacher']}
+                facets = requests.get(f"{tester.BASE_URL}/courses/courses/facets/", params=filters)
+                filtered = tester.test_list_courses(search='Python Basics', **filters)
+                if facets.status_code == 200 and filtered and any(
+                    c['id'] == course_id for c in filtered.get('results', [])
+                ):
+                    TestLogger.success("Facets and search accepted the combined filters")
+                else:
+                    TestLogger.error(f"Combined filters failed: facets returned {facets.status_code}")
+
+            # Test conditional GET on an unchanged course
+            url = f"{tester.BASE_URL}/courses/courses/{course_id}/"
+            first = requests.get(url, headers=tester.get_headers())
+            revalidated = requests.get(
+                url, headers={**tester.get_headers(), 'If-None-Match': first.headers.get('ETag', '')}
+            )
+            if revalidated.status_code == 304:
+                TestLogger.success("Unchanged course details returned 304 Not Modified")
+            else:
+                TestLogger.error(f"Expected 304 for unchanged course, got {revalidated.status_code}")
             
             # Test course update
             update = tester.test_update_course(
@@ -84,6 +84,42 @@ class LessonTest(CourseTest):
             TestLogger.error(f"Error updating lesson: {str(e)}")
             return None
 
+    def test_save_lesson_batch(self, course_id, lesson_id):
+        """
+        Add two draft lessons in front of an existing one in a single batch
+        """
+        url = f"{self.BASE_URL}/courses/courses/{course_id}/lessons/bulk/"
+        data = {
+            'lessons': [
+                {'id': lesson_id, 'order': 3},
+                {'title': 'Setup', 'description': 'Installing Python', 'lesson_type': 'reading',
+                 'order': 1, 'duration_minutes': 10},
+                {'title': 'Tooling', 'description': 'Editors and the REPL', 'lesson_type': 'video',
+                 'order': 2, 'duration_minutes': 15}
+            ]
+        }
+        
+        try:
+            response = requests.post(url, json=data, headers=self.get_headers())
+            result = self.handle_response(response, "Save Lesson Batch")
+            if result and [lesson['order'] for lesson in result] != [3, 1, 2]:
+                TestLogger.error(f"Unexpected lesson orders: {[lesson['order'] for lesson in result]}")
+                return None
+            return result
+        except Exception as e:
+            TestLogger.error(f"Error saving lesson batch: {str(e)}")
+            return None
+
+    def test_move_lesson(self, lesson_id, after_id):
+        url = f"{self.BASE_URL}/courses/lessons/{lesson_id}/move/"
+        
+        try:
+            response = requests.post(url, json={'after': after_id}, headers=self.get_headers())
+            return self.handle_response(response, "Move Lesson")
+        except Exception as e:
+            TestLogger.error(f"Error moving lesson: {str(e)}")
+            return None
+
     def test_delete_lesson(self, lesson_id):
         if not self.access_token:
             TestLogger.error("Authentication required to delete lesson")
@@ -112,6 +148,79 @@ class LessonTest(CourseTest):
             TestLogger.error(f"Error marking lesson complete: {str(e)}")
             return None
 
+    def test_lesson_heartbeat(self, lesson_id):
+        url = f"{self.BASE_URL}/courses/lessons/{lesson_id}/heartbeat/"
+        
+        try:
+            response = requests.post(
+                url, json={'elapsed_seconds': 30, 'position_seconds': 120}, headers=self.get_headers()
+            )
+            TestLogger.log(f"Lesson Heartbeat - Status Code: {response.status_code}")
+            if response.status_code != 202:
+                TestLogger.error(f"Lesson Heartbeat failed: {response.text}")
+                return False
+            TestLogger.success("Lesson Heartbeat accepted")
+            return True
+        except Exception as e:
+            TestLogger.error(f"Error sending lesson heartbeat: {str(e)}")
+            return False
+
+    def test_get_lesson_content(self, lesson_id):
+        url = f"{self.BASE_URL}/courses/lessons/{lesson_id}/content/"
+        
+        try:
+            response = requests.get(url, headers=self.get_headers())
+            result = self.handle_response(response, "Get Lesson Content")
+            if result is None:
+                return None
+            # Unchanged content is revalidated without a body
+            headers = {**self.get_headers(), 'If-None-Match': response.headers.get('ETag', '')}
+            response = requests.get(url, headers=headers)
+            TestLogger.log(f"Revalidate Lesson Content - Status Code: {response.status_code}")
+            if response.status_code != 304:
+                TestLogger.error("Unchanged lesson content was sent again")
+            return result
+        except Exception as e:
+            TestLogger.error(f"Error getting lesson content: {str(e)}")
+            return None
+
+    def test_set_lesson_published(self, lesson_id, is_published):
+        url = f"{self.BASE_URL}/courses/lessons/{lesson_id}/"
+        
+        try:
+            response = requests.patch(url, json={'is_published': is_published}, headers=self.get_headers())
+            return self.handle_response(response, "Publish Lesson" if is_published else "Unpublish Lesson")
+        except Exception as e:
+            TestLogger.error(f"Error changing lesson publication: {str(e)}")
+            return None
+
+    def test_get_course_progress(self, course_id):
+        url = f"{self.BASE_URL}/courses/courses/{course_id}/progress/"
+        
+        try:
+            response = requests.get(url, headers=self.get_headers())
+            return self.handle_response(response, "Get Course Progress")
+        except Exception as e:
+            TestLogger.error(f"Error getting course progress: {str(e)}")
+            return None
+
+    def check_progress(self, course_id, expected_total, expected_completed):
+        """
+        Compare the stored progress with the naive computation
+        """
+        progress = self.test_get_course_progress(course_id)
+        if not progress:
+            return False
+        expected_percentage = round(expected_completed / expected_total * 100, 2) if expected_total else 0
+        actual = (progress['total_lessons'], progress['completed_lessons'], progress['progress_percentage'])
+        if actual != (expected_total, expected_completed, expected_percentage):
+            TestLogger.error(
+                f"Progress {actual} does not match {(expected_total, expected_completed, expected_percentage)}"
+            )
+            return False
+        TestLogger.success(f"Progress {progress['progress_percentage']}% matches the naive computation")
+        return True
+
     def test_enroll_in_course(self, course_id):
         if not self.access_token:
             TestLogger.error("Authentication required for enrollment")
@@ -205,6 +314,20 @@ def run_lesson_tests():
     if updated_lesson:
         TestLogger.success("Lesson update successful")
     
+    # Create and reorder lessons in one batch
+    batch = tester.test_save_lesson_batch(course_id, lesson_id)
+    if batch:
+        TestLogger.success(f"Saved {len(batch)} lessons in one batch")
+        
+        # Move the original lesson back to the front
+        if tester.test_move_lesson(lesson_id, None):
+            lessons = tester.test_list_course_lessons(course_id)
+            lessons = lessons.get('results', []) if isinstance(lessons, dict) else lessons or []
+            if lessons and lessons[0]['id'] == lesson_id:
+                TestLogger.success("Moved lesson is listed first")
+            else:
+                TestLogger.error("Moved lesson is not listed first")
+    
     # Register and login as student
     student_email = f"lessonstudent{timestamp}@example.com"
     student_password = "StudentPass123!"
@@ -232,10 +355,30 @@ def run_lesson_tests():
         TestLogger.error("Course enrollment failed. Stopping tests.")
         return
     
+    # Time on task is buffered, the heartbeat is only accepted
+    tester.test_lesson_heartbeat(lesson_id)
+    
+    # Lesson lists are outlines, the content comes from its own endpoint
+    content = tester.test_get_lesson_content(lesson_id)
+    if content and content.get('content'):
+        TestLogger.success("Retrieved lesson content")
+    
     # Mark lesson as complete
     completion = tester.test_mark_lesson_complete(lesson_id)
     if completion:
         TestLogger.success("Successfully marked lesson as complete")
+        tester.check_progress(course_id, 1, 1)
+        
+        # Unpublishing and republishing the lesson updates the stored progress
+        student_token = tester.access_token
+        if tester.test_login(teacher_email, teacher_password):
+            tester.test_set_lesson_published(lesson_id, False)
+            tester.access_token, teacher_token = student_token, tester.access_token
+            tester.check_progress(course_id, 0, 1)
+            tester.access_token = teacher_token
+            tester.test_set_lesson_published(lesson_id, True)
+            tester.access_token = student_token
+            tester.check_progress(course_id, 1, 1)
     
     # Login back as teacher to clean up
     if tester.test_login(teacher_email, teacher_password):
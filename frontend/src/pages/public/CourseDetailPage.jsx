@@ -182,7 +182,7 @@ function CourseDetailPage() {
                     {renderStars(course.rating)}
                   </div>
                   <span className="ml-2 text-sm text-gray-400">
-                    {course.rating} ({course.reviews?.length || 0} reviews)
+                    {course.rating} ({course.rating_count || 0} reviews)
                   </span>
                 </div>
                 <span className="text-gray-500">•</span>
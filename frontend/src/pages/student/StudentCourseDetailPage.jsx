@@ -20,6 +20,7 @@ function StudentCourseDetailPage() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [activeLesson, setActiveLesson] = useState(null);
+  const [lessonContent, setLessonContent] = useState('');
   const [progress, setProgress] = useState(0);
   const [completedLessons, setCompletedLessons] = useState([]);
   const [showNotes, setShowNotes] = useState(false);
@@ -73,6 +74,21 @@ function StudentCourseDetailPage() {
     fetchCourseDetails();
   }, [id, isStudent, isEnrolledInCourse, navigate]);
 
+  // Course outlines leave the lesson content out, load it for the open lesson
+  useEffect(() => {
+    if (!activeLesson) return;
+    let cancelled = false;
+    setLessonContent('');
+    courseApi.getLessonContent(activeLesson.id)
+      .then(data => {
+        if (!cancelled) setLessonContent(data.content || '');
+      })
+      .catch(err => console.error('Error fetching lesson content:', err));
+    return () => {
+      cancelled = true;
+    };
+  }, [activeLesson?.id]);
+
   // Fetch available rooms periodically
   useEffect(() => {
     if (course) {
@@ -478,7 +494,7 @@ function StudentCourseDetailPage() {
                   )}
                   
                   {/* Lesson Content */}
-                  {activeLesson.content && (
+                  {lessonContent && (
                     <div className="bg-gray-700/30 rounded-xl p-6 mb-6 border border-gray-600/30">
                       <h3 className="text-lg font-semibold text-white mb-4 flex items-center">
                         <FiBook className="mr-2 h-5 w-5 text-primary-400" />
@@ -486,7 +502,7 @@ function StudentCourseDetailPage() {
                       </h3>
                       <div className="prose prose-invert max-w-none">
                         <div className="text-gray-300 leading-relaxed whitespace-pre-wrap">
-                          {activeLesson.content}
+                          {lessonContent}
                         </div>
                       </div>
                     </div>
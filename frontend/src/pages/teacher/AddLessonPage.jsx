@@ -15,7 +15,6 @@ function AddLessonPage() {
     title: '',
     description: '',
     lesson_type: 'reading',
-    order: 1,
     duration_minutes: 30,
     content: '',
     is_published: false
@@ -43,12 +42,6 @@ function AddLessonPage() {
       try {
         const courseData = await courseApi.getCourseById(courseId);
         setCourseTitle(courseData.title);
-        
-        // Set the next order number based on existing lessons
-        if (courseData.lessons && courseData.lessons.length > 0) {
-          const maxOrder = Math.max(...courseData.lessons.map(lesson => lesson.order));
-          setFormData(prev => ({ ...prev, order: maxOrder + 1 }));
-        }
       } catch (err) {
         console.error('Error fetching course:', err);
         setError('Failed to load course details');
@@ -231,21 +224,6 @@ function AddLessonPage() {
                     className="w-full bg-gray-700 border border-gray-600 rounded-md py-2 px-3 text-white focus:outline-none focus:ring-2 focus:ring-primary-500 focus:border-transparent"
                   />
                 </div>
-                
-                <div>
-                  <label htmlFor="order" className="block text-sm font-medium text-gray-300 mb-1">
-                    Order
-                  </label>
-                  <input
-                    type="number"
-                    id="order"
-                    name="order"
-                    value={formData.order}
-                    onChange={handleChange}
-                    min="1"
-                    className="w-full bg-gray-700 border border-gray-600 rounded-md py-2 px-3 text-white focus:outline-none focus:ring-2 focus:ring-primary-500 focus:border-transparent"
-                  />
-                </div>
               </div>
               
               <div>
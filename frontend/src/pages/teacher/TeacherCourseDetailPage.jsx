@@ -458,7 +458,7 @@ function TeacherCourseDetailPage() {
                     <div className="flex items-start justify-between mb-4">
                       <div className="flex items-start gap-4 flex-1">
                         <div className="w-12 h-12 bg-gradient-to-r from-primary-500 to-primary-600 rounded-xl flex items-center justify-center text-white text-lg font-bold shadow-lg">
-                          {lesson.order || index + 1}
+                          {index + 1}
                         </div>
                         <div className="flex-1">
                           <h3 className="text-xl font-semibold text-white mb-2 group-hover:text-primary-300 transition-colors">{lesson.title}</h3>
@@ -42,6 +42,18 @@ const courseApi = {
     }
   },
 
+  // Get course cards for several IDs in one request (results keep the given order)
+  getCoursesByIds: async (courseIds) => {
+    try {
+      const response = await api.get('/courses/courses/batch/', {
+        params: { ids: courseIds.join(',') },
+      });
+      return response.data.results;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
   // Create new course (teachers only)
   createCourse: async (courseData) => {
     try {
@@ -206,6 +218,16 @@ const courseApi = {
     }
   },
 
+  // Teacher: Enroll a class by student ids or emails
+  enrollRoster: async (courseId, students) => {
+    try {
+      const response = await api.post(`/courses/courses/${courseId}/roster/`, { students });
+      return response.data;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
   // Student: Unenroll from course
   unenrollFromCourse: async (courseId) => {
     try {
@@ -253,6 +275,16 @@ const courseApi = {
     }
   },
 
+  // Get a lesson's full content, which lesson lists and course outlines leave out
+  getLessonContent: async (lessonId) => {
+    try {
+      const response = await api.get(`/courses/lessons/${lessonId}/content/`);
+      return response.data;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
   // Update lesson
   updateLesson: async (lessonId, lessonData) => {
     try {
@@ -280,6 +312,26 @@ const courseApi = {
     }
   },
 
+  // Create and update many lessons at once: entries with an id update that lesson
+  saveLessonBatch: async (courseId, lessons) => {
+    try {
+      const response = await api.post(`/courses/courses/${courseId}/lessons/bulk/`, { lessons });
+      return response.data;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
+  // Move a lesson right after another one (afterLessonId null to move it first)
+  moveLesson: async (lessonId, afterLessonId) => {
+    try {
+      const response = await api.post(`/courses/lessons/${lessonId}/move/`, { after: afterLessonId });
+      return response.data;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
   // Mark lesson as complete
   markLessonComplete: async (lessonId) => {
     try {
@@ -290,6 +342,26 @@ const courseApi = {
     }
   },
 
+  // Replay lesson completions made offline: [{ lesson_id, completed_at, time_spent }]
+  syncLessonProgress: async (completions) => {
+    try {
+      const response = await api.post('/courses/lessons/sync-progress/', { completions });
+      return response.data;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
+  // Report time on task while a lesson is open: { elapsed_seconds, position_seconds }
+  sendLessonHeartbeat: async (lessonId, heartbeat) => {
+    try {
+      const response = await api.post(`/courses/lessons/${lessonId}/heartbeat/`, heartbeat);
+      return response.data;
+    } catch (error) {
+      throw handleApiError(error);
+    }
+  },
+
   // Get course progress
   getCourseProgress: async (courseId) => {
     try {
@@ -322,9 +394,9 @@ const courseApi = {
   },
 
   // Get course reviews
-  getCourseReviews: async (courseId) => {
+  getCourseReviews: async (courseId, params = {}) => {
     try {
-      const response = await api.get(`/courses/courses/${courseId}/reviews/`);
+      const response = await api.get(`/courses/courses/${courseId}/reviews/`, { params });
       return response.data;
     } catch (error) {
       throw handleApiError(error);